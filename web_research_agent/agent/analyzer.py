@@ -2,9 +2,11 @@
 import logging
 from typing import Dict, List, Any
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 import google.generativeai as genai
-from config import GEMINI_API_KEY
+from agent.llm import PRIORITY_ANALYSIS
+from agent.structured_output import StructuredOutput, ContentAnalysisResult, CONTENT_ANALYSIS_SCHEMA, FRESHNESS_PROPERTY
+from config import GEMINI_API_KEY, FRESHNESS_HALF_LIFE_DAYS
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,7 @@ class ContentAnalyzer:
     def __init__(self):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.structured = StructuredOutput()
         logger.info("ContentAnalyzer initialized")
     
     def analyze_content(self, query: str, url_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -27,7 +30,7 @@ class ContentAnalyzer:
         Returns:
             Dict with analysis results
         """
-        logger.info(f"Analyzing content from: {url_data['url']}")
+        logger.debug("Analyzing content from: %s", url_data['url'])
         
         analysis = {
             "url": url_data["url"],
@@ -42,7 +45,7 @@ class ContentAnalyzer:
         
         # Skip analysis if content is empty or there was an error
         if not url_data.get("success") or not url_data.get("content"):
-            logger.warning(f"Skipping analysis for {url_data['url']} - no content or failed scrape")
+            logger.warning("Skipping analysis for %s - no content or failed scrape", url_data['url'])
             analysis["error"] = url_data.get("error", "No content available")
             return analysis
         
@@ -60,6 +63,12 @@ class ContentAnalyzer:
         # Check if this content seems to answer the query
         analysis["query_match"] = analysis["relevance_score"] > 0.5
         
+        # Score freshness locally when the scraper found a publication date
+        published_at = url_data.get("published_at")
+        if published_at:
+            analysis["published_at"] = published_at.isoformat()
+            analysis["freshness_score"] = self._freshness_score(published_at)
+        
         # Use Gemini to analyze content
         # Truncate content if too long to avoid token limits
         max_content_length = 15000
@@ -76,41 +85,39 @@ class ContentAnalyzer:
         Provide a JSON response with these fields:
         1. relevance_score: A number between 0-1 indicating relevance to the query
         2. reliability_score: A number between 0-1 assessing the reliability of the information
-        3. freshness_score: A number between 0-1 indicating how recent the information seems (0=outdated, 1=very current)
-        4. key_insights: A list of up to 5 key facts or insights from this content relevant to the query
-        5. summary: A 3-4 sentence summary of how this content relates to the query
+        3. key_insights: A list of up to 5 key facts or insights from this content relevant to the query
+        4. summary: A 3-4 sentence summary of how this content relates to the query
+        {"" if published_at else "5. freshness_score: A number between 0-1 indicating how recent the information seems (0=outdated, 1=very current)"}
         
         Only respond with valid JSON, no additional text.
         """
         
+        schema = CONTENT_ANALYSIS_SCHEMA
+        if not published_at:
+            schema = dict(schema, properties=dict(schema["properties"], **FRESHNESS_PROPERTY))
+        
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text
+            result = self.structured.generate(self.model, prompt, ContentAnalysisResult, schema, PRIORITY_ANALYSIS)
             
-            # Extract JSON if it's wrapped in code blocks
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            import json
-            try:
-                result = json.loads(response_text)
-                
+            if result is not None:
                 # Update analysis with AI results
                 analysis.update({
-                    "relevance_score": result.get("relevance_score", analysis["relevance_score"]),
-                    "reliability_score": result.get("reliability_score", 0.0),
-                    "freshness_score": result.get("freshness_score", 0.0),
-                    "key_insights": result.get("key_insights", []),
-                    "summary": result.get("summary", "")
+                    "relevance_score": result.relevance_score,
+                    "reliability_score": result.reliability_score,
+                    "freshness_score": analysis["freshness_score"] if published_at else (result.freshness_score or 0.0),
+                    "key_insights": result.key_insights,
+                    "summary": result.summary
                 })
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON from Gemini response")
         
         except Exception as e:
-            logger.error(f"Error using Gemini for content analysis: {e}")
+            logger.error("Error using Gemini for content analysis: %s", e)
         
-        logger.info(f"Completed analysis for {url_data['url']} - Relevance: {analysis['relevance_score']:.2f}")
-        return analysis
\ No newline at end of file
+        logger.info("Completed analysis for %s - Relevance: %.2f", url_data['url'], analysis['relevance_score'])
+        return analysis
+    
+    def _freshness_score(self, published_at: datetime) -> float:
+        """Exponential decay from 1.0 (published now) with a FRESHNESS_HALF_LIFE_DAYS half-life."""
+        age_days = (datetime.now(timezone.utc).replace(tzinfo=None) - published_at).total_seconds() / 86400
+        if age_days <= 0:
+            return 1.0
+        return round(0.5 ** (age_days / FRESHNESS_HALF_LIFE_DAYS), 3)
\ No newline at end of file
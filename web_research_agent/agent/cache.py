@@ -0,0 +1,108 @@
+# agent/cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from config import CACHE_DB_PATH, BROKER_URL
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Persistent key-value cache with per-entry expiry, backed by SQLite."""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        # Several worker processes may share this file
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+        logger.info("TTLCache initialized at %s", db_path)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds."""
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            logger.error("Error writing cache entry %s/%s: %s", namespace, key, e)
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        with self.lock, self.conn:
+            cursor = self.conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+
+class RedisTTLCache:
+    """TTLCache with the same interface on Redis, shared by workers on different machines."""
+
+    PREFIX = "wra:cache:"
+
+    def __init__(self, client):
+        self.client = client
+        logger.info("RedisTTLCache initialized")
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        try:
+            value = self.client.get(f"{self.PREFIX}{namespace}:{key}")
+        except Exception as e:
+            logger.error("Error reading cache entry %s/%s: %s", namespace, key, e)
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds."""
+        try:
+            self.client.set(f"{self.PREFIX}{namespace}:{key}", json.dumps(value), ex=max(1, int(ttl)))
+        except Exception as e:
+            logger.error("Error writing cache entry %s/%s: %s", namespace, key, e)
+
+    def purge_expired(self) -> int:
+        """Redis expires entries itself."""
+        return 0
+
+
+def open_cache(broker_url: str = BROKER_URL):
+    """
+    Open the cache that goes with a broker URL.
+
+    Workers using a Redis broker share their robots, page and analysis caches
+    through it; with a SQLite broker they share the local cache file.
+    """
+    if broker_url.startswith(("redis://", "rediss://")):
+        import redis
+        return RedisTTLCache(redis.Redis.from_url(broker_url))
+    return TTLCache()
@@ -0,0 +1,100 @@
+# agent/clustering.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Any
+
+# Words too common in analyzer output to say anything about a source's topic
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could for from has have in into is it its
+may more most not of on or such than that the their there these this those to
+was were which while will with would also other use used using new based
+""".split())
+
+
+def _tokens(source: Dict[str, Any]) -> List[str]:
+    text = " ".join([source.get("title", "")] + [str(i) for i in source.get("key_insights", [])])
+    return [t for t in re.findall(r'[a-z][a-z0-9-]+', text.lower()) if t not in STOPWORDS]
+
+
+def _tfidf_vectors(sources: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    """Unit-length TF-IDF vectors over each source's title and key insights."""
+    token_lists = [_tokens(s) for s in sources]
+    doc_freq = Counter(t for tokens in token_lists for t in set(tokens))
+    n = len(sources)
+
+    vectors = []
+    for tokens in token_lists:
+        counts = Counter(tokens)
+        vector = {t: c * math.log((1 + n) / (1 + doc_freq[t])) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        vectors.append({t: v / norm for t, v in vector.items()})
+    return vectors
+
+
+def _similarity(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def cluster_sources(sources: List[Dict[str, Any]], group_size: int, iterations: int = 5) -> List[List[int]]:
+    """
+    Group sources by topic using k-means over TF-IDF vectors of their key insights.
+
+    Args:
+        sources: Analyzed content dicts (title, key_insights)
+        group_size: Target number of sources per group; no group exceeds it
+        iterations: k-means refinement rounds
+
+    Returns:
+        List of groups, each a list of indices into sources
+    """
+    if len(sources) <= group_size:
+        return [list(range(len(sources)))]
+
+    vectors = _tfidf_vectors(sources)
+    k = math.ceil(len(sources) / group_size)
+
+    # Farthest-first seeding: start from the first source, then repeatedly take
+    # the source least similar to every centroid picked so far
+    centroids = [vectors[0]]
+    while len(centroids) < k:
+        best = min(range(len(vectors)), key=lambda i: max(_similarity(vectors[i], c) for c in centroids))
+        centroids.append(vectors[best])
+
+    assignment = [0] * len(vectors)
+    for _ in range(iterations):
+        assignment = [max(range(k), key=lambda c: _similarity(v, centroids[c])) for v in vectors]
+
+        new_centroids = []
+        for c in range(k):
+            members = [vectors[i] for i, a in enumerate(assignment) if a == c]
+            if not members:
+                new_centroids.append(centroids[c])
+                continue
+            summed = Counter()
+            for member in members:
+                summed.update(member)
+            norm = math.sqrt(sum(v * v for v in summed.values())) or 1.0
+            new_centroids.append({t: v / norm for t, v in summed.items()})
+        centroids = new_centroids
+
+    # Split any oversized cluster so each map prompt stays small
+    groups = []
+    for c in range(k):
+        members = [i for i, a in enumerate(assignment) if a == c]
+        for start in range(0, len(members), group_size):
+            groups.append(members[start:start + group_size])
+
+    # Pack undersized leftovers together rather than paying a map call for each
+    full = [g for g in groups if len(g) * 2 > group_size]
+    small = sorted((g for g in groups if 0 < len(g) * 2 <= group_size), key=len, reverse=True)
+    packed = []
+    for group in small:
+        target = next((p for p in packed if len(p) + len(group) <= group_size), None)
+        if target is None:
+            packed.append(list(group))
+        else:
+            target.extend(group)
+    return full + packed
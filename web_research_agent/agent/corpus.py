@@ -0,0 +1,177 @@
+# agent/corpus.py
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Optional
+from config import CORPUS_DB_PATH
+from agent.date_extractor import parse_date
+
+logger = logging.getLogger(__name__)
+
+class Corpus:
+    """
+    Local full-text index over every page the scraper has cleaned.
+
+    Pages are stored in SQLite with an FTS5 index kept in sync by triggers,
+    so inserts are incremental and repeated scrapes of a URL replace the old text.
+    """
+
+    def __init__(self, db_path: str = CORPUS_DB_PATH):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.db_path = db_path
+        # Workers share the file; WAL lets searches run while another process writes
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self._create_tables()
+        logger.info("Corpus initialized at %s", db_path)
+
+    def _create_tables(self):
+        """Create the page table, its FTS5 index and the sync triggers."""
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL DEFAULT '',
+                    content TEXT NOT NULL DEFAULT '',
+                    published_at TEXT,
+                    fetched_at REAL NOT NULL
+                );
+
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+                    title, content, content='pages', content_rowid='id'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+                    INSERT INTO pages_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+                    INSERT INTO pages_fts(pages_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+                    INSERT INTO pages_fts(pages_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                    INSERT INTO pages_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+            """)
+
+    def add_page(self, scraped_data: Dict[str, Any]) -> bool:
+        """
+        Insert or replace a scraped page in the index.
+
+        Args:
+            scraped_data: Dict returned by Scraper.scrape_url
+
+        Returns:
+            True if the page was stored
+        """
+        if not scraped_data.get("success") or not scraped_data.get("content"):
+            return False
+
+        published_at = scraped_data.get("metadata", {}).get("detected_date")
+
+        try:
+            with self.lock, self.conn:
+                self.conn.execute("""
+                    INSERT INTO pages (url, title, content, published_at, fetched_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title = excluded.title,
+                        content = excluded.content,
+                        published_at = excluded.published_at,
+                        fetched_at = excluded.fetched_at
+                """, (
+                    scraped_data["url"],
+                    scraped_data.get("title", ""),
+                    scraped_data["content"],
+                    published_at,
+                    time.time()
+                ))
+            return True
+
+        except sqlite3.Error as e:
+            logger.error("Error adding %s to corpus: %s", scraped_data['url'], e)
+            return False
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a stored page, shaped like a Scraper.scrape_url result.
+
+        Returns:
+            Dict with the stored content, or None if the URL was never indexed
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, title, content, published_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        metadata = {}
+        if row["published_at"]:
+            metadata["detected_date"] = row["published_at"]
+
+        return {
+            "url": row["url"],
+            "success": True,
+            "content": row["content"],
+            "html": "",
+            "title": row["title"],
+            "metadata": metadata,
+            "published_at": parse_date(row["published_at"] or ""),
+            "error": None
+        }
+
+    def search(self, query: str, num_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Full-text search over the stored pages, best BM25 matches first.
+
+        Returns:
+            List of dicts with url, title, snippet and published_at
+        """
+        # Quote every term so user input cannot be read as FTS5 query syntax
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return []
+        match_expr = " OR ".join(f'"{term}"' for term in terms)
+
+        try:
+            with self.lock:
+                rows = self.conn.execute("""
+                    SELECT pages.url, pages.title, pages.published_at,
+                           snippet(pages_fts, 1, '', '', '...', 32) AS snippet
+                    FROM pages_fts
+                    JOIN pages ON pages.id = pages_fts.rowid
+                    WHERE pages_fts MATCH ?
+                    ORDER BY bm25(pages_fts, 5.0, 1.0)
+                    LIMIT ?
+                """, (match_expr, num_results)).fetchall()
+
+        except sqlite3.Error as e:
+            logger.error("Corpus search error: %s", e)
+            return []
+
+        return [
+            {
+                "url": row["url"],
+                "title": row["title"],
+                "snippet": row["snippet"],
+                "published_at": row["published_at"] or ""
+            }
+            for row in rows
+        ]
+
+    def page_count(self) -> int:
+        """Return the number of pages in the index."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
@@ -0,0 +1,162 @@
+# agent/date_extractor.py
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional
+from bs4 import BeautifulSoup
+from config import DATE_SCAN_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Meta tags that carry a publication date, most specific first (matched case-insensitively)
+DATE_META_KEYS = [
+    "article:published_time",
+    "article:published",
+    "og:published_time",
+    "datepublished",
+    "prism.publicationdate",
+    "citation_online_date",
+    "dc.date.issued",
+    "dc.date",
+    "citation_publication_date",
+    "citation_date",
+    "parsely-pub-date",
+    "sailthru.date",
+    "pubdate",
+    "publishdate",
+    "date",
+]
+
+MONTHS = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?'
+
+# Patterns for the plain-text fallback, tried in order on each text node
+TEXT_DATE_PATTERNS = [
+    re.compile(r'\b(\d{4}[-/]\d{1,2}[-/]\d{1,2})\b'),  # YYYY-MM-DD
+    re.compile(r'\b(\d{1,2}[-/]\d{1,2}[-/]\d{4})\b'),  # MM-DD-YYYY or DD-MM-YYYY
+    re.compile(r'\b(' + MONTHS + r' \d{1,2},? \d{4})\b'),  # March 5, 2024
+    re.compile(r'\b(\d{1,2} ' + MONTHS + r',? \d{4})\b'),  # 5 March 2024
+]
+
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y",
+    "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y",
+    "%d %B %Y", "%d %b %Y", "%d %B, %Y", "%d %b, %Y",
+    # citation_publication_date style: "2021 Jul 5", "2021 Jul"
+    "%Y %b %d", "%Y %B %d", "%Y %b", "%Y %B",
+    "%Y/%m", "%Y-%m", "%Y",
+]
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    """
+    Parse a date string from a page into a naive UTC datetime.
+
+    Handles ISO 8601 timestamps (as used in meta tags, JSON-LD and <time>) and
+    the common human-readable formats. Returns None if nothing sensible parses.
+    """
+    if not value:
+        return None
+    value = value.strip()
+
+    parsed = None
+    iso_value = value[:-1] + "+00:00" if value.endswith("Z") else value
+    try:
+        parsed = datetime.fromisoformat(iso_value)
+    except ValueError:
+        # Drop trailing periods from abbreviated months ("Sept. 5, 2024")
+        plain_value = re.sub(r'(?<=[A-Za-z])\.', '', value).replace('Sept ', 'Sep ')
+        for fmt in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(plain_value, fmt)
+                break
+            except ValueError:
+                continue
+
+    if parsed is None:
+        return None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+    # Reject implausible years (version numbers, IDs, typos)
+    if not 1990 <= parsed.year <= datetime.now(timezone.utc).year + 1:
+        return None
+    return parsed
+
+
+def _find_json_ld_date(data: Any) -> Optional[str]:
+    """Depth-first search of a JSON-LD document for the first datePublished."""
+    if isinstance(data, dict):
+        if isinstance(data.get("datePublished"), str):
+            return data["datePublished"]
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+
+    for child in children:
+        found = _find_json_ld_date(child)
+        if found:
+            return found
+    return None
+
+
+def extract_publication_date(soup: BeautifulSoup, max_scan_chars: int = DATE_SCAN_CHARS) -> Optional[datetime]:
+    """
+    Find a page's publication date.
+
+    Structured sources are checked first (publication meta tags, JSON-LD
+    datePublished, <time datetime>); only if none of them parse is the text at
+    the top of the document scanned, stopping after max_scan_chars characters.
+
+    Returns:
+        Naive UTC datetime, or None if no date was found
+    """
+    # 1. Meta tags
+    meta_dates = {}
+    for meta in soup.find_all('meta', content=True):
+        for attr in ('property', 'name', 'itemprop'):
+            key = (meta.get(attr) or '').lower()
+            if key in DATE_META_KEYS and key not in meta_dates:
+                meta_dates[key] = meta['content']
+    for key in DATE_META_KEYS:
+        parsed = parse_date(meta_dates.get(key, ''))
+        if parsed:
+            return parsed
+
+    # 2. JSON-LD
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            # strict=False: CMSes often leave raw newlines and tabs inside JSON-LD strings
+            data = json.loads(script.string or '', strict=False)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        parsed = parse_date(_find_json_ld_date(data) or '')
+        if parsed:
+            return parsed
+
+    # 3. <time datetime="...">
+    for time_tag in soup.find_all('time', attrs={'datetime': True}):
+        parsed = parse_date(time_tag['datetime'])
+        if parsed:
+            return parsed
+
+    # 4. Bounded scan of visible text at the top of the document
+    scanned = 0
+    root = soup.body or soup
+    for text in root.strings:
+        if text.parent is not None and text.parent.name in ('script', 'style', 'noscript'):
+            continue
+        for pattern in TEXT_DATE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                parsed = parse_date(match.group(1))
+                if parsed:
+                    return parsed
+        scanned += len(text)
+        if scanned >= max_scan_chars:
+            break
+
+    return None
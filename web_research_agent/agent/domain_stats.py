@@ -0,0 +1,197 @@
+# agent/domain_stats.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+from urllib.parse import urlparse
+from config import (
+    DOMAIN_STATS_DB_PATH, DOMAIN_STATS_HALF_LIFE, DOMAIN_SKIP_MIN_ATTEMPTS,
+    DOMAIN_SKIP_SUCCESS_RATE, SLOW_DOMAIN_LATENCY, THIN_CONTENT_CHARS
+)
+
+logger = logging.getLogger(__name__)
+
+class DomainStats:
+    """
+    Persistent per-domain fetch history used to rank and skip URLs.
+
+    Counters decay exponentially with DOMAIN_STATS_HALF_LIFE, so a domain that
+    was chronically failing is retried once its old failures have faded.
+    A fetch that succeeds but extracts almost no text, as paywalls and
+    consent walls do, counts as a failure.
+    Workers share the file, so every update is a read-modify-write under
+    SQLite's write lock.
+    """
+
+    # Number of recent latencies kept per domain for percentile estimates
+    LATENCY_WINDOW = 50
+
+    def __init__(self, db_path: str = DOMAIN_STATS_DB_PATH, clock: Callable[[], float] = time.time):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.db_path = db_path
+        self.clock = clock
+        # Autocommit mode so updates can take the write lock up front
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS domains (
+                    domain TEXT PRIMARY KEY,
+                    attempts REAL NOT NULL DEFAULT 0,
+                    successes REAL NOT NULL DEFAULT 0,
+                    content_chars REAL NOT NULL DEFAULT 0,
+                    reliability_sum REAL NOT NULL DEFAULT 0,
+                    reliability_count REAL NOT NULL DEFAULT 0,
+                    latencies TEXT NOT NULL DEFAULT '[]',
+                    last_error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+        logger.info("DomainStats initialized at %s", db_path)
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    @contextmanager
+    def _transaction(self):
+        """Serialize against every other process by taking SQLite's write lock immediately."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    @staticmethod
+    def _empty(domain: str, now: float) -> Dict[str, Any]:
+        return {
+            "domain": domain, "attempts": 0.0, "successes": 0.0, "content_chars": 0.0,
+            "reliability_sum": 0.0, "reliability_count": 0.0, "latencies": [],
+            "last_error": None, "updated_at": now
+        }
+
+    def _load(self, domain: str, now: float) -> Dict[str, Any]:
+        """Read a domain's row with its counters decayed to now. Caller holds the lock."""
+        row = self.conn.execute("SELECT * FROM domains WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            return self._empty(domain, now)
+
+        stats = dict(row)
+        stats["latencies"] = json.loads(stats["latencies"])
+        decay = 0.5 ** (max(0.0, now - stats["updated_at"]) / DOMAIN_STATS_HALF_LIFE)
+        for field in ("attempts", "successes", "content_chars", "reliability_sum", "reliability_count"):
+            stats[field] *= decay
+        stats["updated_at"] = now
+        return stats
+
+    def _save(self, stats: Dict[str, Any]):
+        """Write a domain's row back. Caller holds the transaction."""
+        self.conn.execute("""
+            INSERT OR REPLACE INTO domains
+                (domain, attempts, successes, content_chars, reliability_sum,
+                 reliability_count, latencies, last_error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            stats["domain"], stats["attempts"], stats["successes"], stats["content_chars"],
+            stats["reliability_sum"], stats["reliability_count"],
+            json.dumps(stats["latencies"][-self.LATENCY_WINDOW:]), stats["last_error"], stats["updated_at"]
+        ))
+
+    def record_fetch(self, url: str, success: bool, latency: Optional[float] = None,
+                     content_length: int = 0, error: Optional[str] = None):
+        """Record the outcome of one fetch attempt."""
+        domain = self.domain_of(url)
+        if success and content_length < THIN_CONTENT_CHARS:
+            success, error = False, f"thin content ({content_length} chars)"
+        try:
+            with self._transaction():
+                stats = self._load(domain, self.clock())
+                stats["attempts"] += 1
+                if success:
+                    stats["successes"] += 1
+                    stats["content_chars"] += content_length
+                else:
+                    stats["last_error"] = error
+                if latency is not None:
+                    stats["latencies"].append(round(latency, 3))
+                self._save(stats)
+        except sqlite3.Error as e:
+            logger.error("Error recording fetch stats for %s: %s", domain, e)
+
+    def record_reliability(self, url: str, reliability_score: float):
+        """Record the reliability score Gemini gave a page from this domain."""
+        domain = self.domain_of(url)
+        try:
+            with self._transaction():
+                stats = self._load(domain, self.clock())
+                stats["reliability_sum"] += reliability_score
+                stats["reliability_count"] += 1
+                self._save(stats)
+        except sqlite3.Error as e:
+            logger.error("Error recording reliability for %s: %s", domain, e)
+
+    def get(self, url: str) -> Dict[str, Any]:
+        """
+        Summarize a domain's decayed history.
+
+        Returns:
+            Dict with attempts, success_rate, latency_p50, latency_p90,
+            avg_content_length and mean_reliability (None where there is no data)
+        """
+        domain = self.domain_of(url)
+        try:
+            with self.lock:
+                stats = self._load(domain, self.clock())
+        except sqlite3.Error as e:
+            # Ranking without history beats failing the research run
+            logger.error("Error reading stats for %s: %s", domain, e)
+            stats = self._empty(domain, self.clock())
+
+        latencies = sorted(stats["latencies"])
+        return {
+            "domain": domain,
+            "attempts": stats["attempts"],
+            # Smoothed so a single failure does not condemn a domain
+            "success_rate": (stats["successes"] + 1) / (stats["attempts"] + 2),
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p90": latencies[int(len(latencies) * 0.9)] if latencies else None,
+            "avg_content_length": stats["content_chars"] / stats["successes"] if stats["successes"] else None,
+            "mean_reliability": (stats["reliability_sum"] / stats["reliability_count"]
+                                 if stats["reliability_count"] else None),
+            "last_error": stats["last_error"]
+        }
+
+    def score(self, url: str) -> float:
+        """
+        Priority adjustment for a URL based on its domain's history.
+
+        Unknown domains score 0; chronically failing, slow or unreliable ones go negative.
+        """
+        stats = self.get(url)
+        if stats["attempts"] < 0.1:
+            return 0.0
+
+        adjustment = stats["success_rate"] - 0.5
+        if stats["mean_reliability"] is not None:
+            adjustment += 0.5 * (stats["mean_reliability"] - 0.5)
+        if stats["latency_p90"] is not None and stats["latency_p90"] > SLOW_DOMAIN_LATENCY:
+            adjustment -= 0.25
+        return adjustment
+
+    def should_skip(self, url: str) -> bool:
+        """True if the domain has failed often enough recently that fetching it is a waste."""
+        stats = self.get(url)
+        return (stats["attempts"] >= DOMAIN_SKIP_MIN_ATTEMPTS
+                and stats["success_rate"] < DOMAIN_SKIP_SUCCESS_RATE)
@@ -0,0 +1,182 @@
+# agent/llm.py
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+from config import (
+    LLM_INITIAL_CONCURRENCY, LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE, LLM_OUTPUT_TOKEN_ESTIMATE, LLM_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are dispatched first; synthesis must never wait behind page analyses
+PRIORITY_SYNTHESIS = 0
+PRIORITY_QUERY = 1
+PRIORITY_SUMMARY = 2
+PRIORITY_ANALYSIS = 3
+
+# Sliding window over which request and token budgets are enforced
+QUOTA_WINDOW = 60.0
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough prompt token count (about four characters per token) plus the expected output."""
+    return len(prompt) // 4 + LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+def is_quota_error(error: Exception) -> bool:
+    """
+    True for 429 / RESOURCE_EXHAUSTED responses from the Gemini API.
+
+    Decided by exception type and status code only: auth and project-setup
+    errors also mention "quota" in their message but retrying cannot fix them.
+    """
+    try:
+        from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+        if isinstance(error, (ResourceExhausted, TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    status = getattr(error, "grpc_status_code", None)
+    return getattr(status, "name", status) == "RESOURCE_EXHAUSTED"
+
+
+class LLMDispatcher:
+    """
+    Shared gate for every Gemini call in the process.
+
+    - Concurrency adapts AIMD-style: +1/limit per success, halved on a quota error.
+    - Requests and estimated tokens are budgeted over a sliding one-minute window.
+    - Waiting callers are served strictly by priority, then arrival order.
+    - Quota errors are retried with exponential backoff instead of surfacing.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: float = LLM_INITIAL_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES
+    ):
+        self.limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        # (start time, estimated tokens) for every call in the current window
+        self.window = deque()
+        self.window_tokens = 0
+
+        self.stats = {"calls": 0, "quota_errors": 0, "retries": 0, "failures": 0}
+        logger.info("LLMDispatcher initialized (concurrency %.0f/%s, %s RPM, %s TPM)",
+                    self.limit, max_concurrency, requests_per_minute, tokens_per_minute)
+
+    def generate(self, model: Any, prompt: str, priority: int = PRIORITY_ANALYSIS, **kwargs) -> Any:
+        """
+        Run model.generate_content(prompt, **kwargs) under the shared limits.
+
+        Quota errors are retried up to max_retries times with exponential backoff;
+        any other error, or a quota error after the last retry, is raised.
+        """
+        tokens = estimate_tokens(prompt)
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority, tokens)
+            try:
+                response = model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                quota_error = is_quota_error(e)
+                self._release(success=False, quota_error=quota_error)
+                if not quota_error or attempt == self.max_retries:
+                    with self.condition:
+                        self.stats["failures"] += 1
+                    raise
+                delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("Gemini quota exceeded, concurrency now %.1f; retrying in %.1fs (attempt %s/%s)",
+                               self.limit, delay, attempt + 1, self.max_retries)
+                with self.condition:
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+                continue
+
+            self._release(success=True, quota_error=False)
+            return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Call counters so far, plus the current concurrency limit."""
+        with self.condition:
+            return dict(self.stats, concurrency_limit=round(self.limit, 2))
+
+    def _acquire(self, priority: int, tokens: int):
+        """Block until this caller is first in line and both concurrency and quota allow a call."""
+        with self.condition:
+            entry = (priority, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    now = time.time()
+                    self._expire_window(now)
+                    wait_for = self._budget_wait(now, tokens)
+                    if (self.waiting[0] == entry and self.in_flight < max(1, int(self.limit))
+                            and wait_for == 0):
+                        break
+                    self.condition.wait(timeout=wait_for or None)
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+
+            self.in_flight += 1
+            self.window.append((now, tokens))
+            self.window_tokens += tokens
+            self.stats["calls"] += 1
+            self.condition.notify_all()
+
+    def _release(self, success: bool, quota_error: bool):
+        with self.condition:
+            self.in_flight -= 1
+            if quota_error:
+                self.stats["quota_errors"] += 1
+                self.limit = max(1.0, self.limit / 2)
+            elif success:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self.condition.notify_all()
+
+    def _expire_window(self, now: float):
+        while self.window and self.window[0][0] <= now - QUOTA_WINDOW:
+            _, tokens = self.window.popleft()
+            self.window_tokens -= tokens
+
+    def _budget_wait(self, now: float, tokens: int) -> float:
+        """Seconds until the window has room for one more call of this size (0 if it has room now)."""
+        if not self.window:
+            return 0
+        over_requests = len(self.window) >= self.requests_per_minute
+        over_tokens = self.window_tokens + tokens > self.tokens_per_minute
+        if not over_requests and not over_tokens:
+            return 0
+        # Oldest entry leaving the window is the earliest point anything can change
+        return max(0.01, self.window[0][0] + QUOTA_WINDOW - now)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    """Return the process-wide dispatcher, creating it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = LLMDispatcher()
+        return _dispatcher
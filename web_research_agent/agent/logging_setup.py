@@ -0,0 +1,120 @@
+# agent/logging_setup.py
+import atexit
+import itertools
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+from config import LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_SAMPLE_EVERY
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N INFO records from each high-volume stage logger.
+
+    Only INFO is sampled: DEBUG is only enabled when someone wants every
+    record, and WARNING and above always pass, as does everything from
+    loggers without a rate.
+    """
+
+    def __init__(self, sample_every: Dict[str, int]):
+        super().__init__()
+        self.sample_every = sample_every
+        # next() on itertools.count is atomic under the GIL, so no lock is needed
+        self.counters = {name: itertools.count() for name in sample_every}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.INFO:
+            return True
+        every = self.sample_every.get(record.name)
+        if not every or every <= 1:
+            return True
+        return next(self.counters[record.name]) % every == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() merges the arguments into the message on the calling
+    thread so the record can be pickled; this queue never leaves the process,
+    so the record is handed over as is. Arguments must therefore not be
+    mutated after they are logged.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    log_file: Optional[str] = LOG_FILE,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    sample_every: Dict[str, int] = LOG_SAMPLE_EVERY,
+    console: bool = True
+) -> QueueListener:
+    """
+    Route all logging through one queue drained by a background thread.
+
+    Callers only append the record to an in-memory queue; formatting and the
+    writes to the size-rotated log file and the console happen on the
+    listener thread. Calling it again returns the running listener.
+
+    Args:
+        level: Root log level name
+        log_file: Path of the rotating log file, or None for console only
+        max_bytes: Size at which the log file is rotated
+        backup_count: Rotated files kept
+        sample_every: Logger name -> keep 1 in N INFO records
+        console: Also write to stderr
+
+    Returns:
+        The started QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                            encoding="utf-8", delay=True))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_every))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Write out everything still queued and stop the background thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -3,6 +3,8 @@ import logging
 from typing import Dict, List, Any
 import re
 import google.generativeai as genai
+from agent.llm import PRIORITY_QUERY
+from agent.structured_output import StructuredOutput, QueryAnalysisResult, QUERY_ANALYSIS_SCHEMA
 from config import GEMINI_API_KEY
 
 logger = logging.getLogger(__name__)
@@ -15,6 +17,7 @@ class QueryAnalyzer:
     def __init__(self):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.structured = StructuredOutput()
         logger.info("QueryAnalyzer initialized")
     
     def analyze_query(self, query: str) -> Dict[str, Any]:
@@ -28,7 +31,7 @@ class QueryAnalyzer:
             - query_type: Type of query (factual, exploratory, news)
             - time_sensitivity: How time-sensitive the query is
         """
-        logger.info(f"Analyzing query: {query}")
+        logger.info("Analyzing query: %s", query)
         
         # Simple rule-based detection for basic categorization
         query_lower = query.lower()
@@ -56,30 +59,17 @@ class QueryAnalyzer:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text
+            result = self.structured.generate(self.model, prompt, QueryAnalysisResult, QUERY_ANALYSIS_SCHEMA, PRIORITY_QUERY)
             
-            # Try to parse as JSON
-            import json
-            try:
-                # Extract JSON if it's wrapped in code blocks
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0]
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].split("```")[0]
-                
-                result = json.loads(response_text)
-                
+            if result is not None:
                 # Update analysis with AI results
                 analysis.update({
-                    "intent": result.get("intent", analysis["intent"]),
-                    "search_terms": result.get("search_terms", analysis["search_terms"]),
-                    "query_type": result.get("query_type", analysis["query_type"]),
-                    "time_sensitivity": result.get("time_sensitivity", analysis["time_sensitivity"])
+                    "intent": result.intent or analysis["intent"],
+                    "search_terms": result.search_terms or analysis["search_terms"],
+                    "query_type": result.query_type,
+                    "time_sensitivity": result.time_sensitivity
                 })
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse JSON from Gemini response")
+            else:
                 # Fall back to basic analysis with some heuristics
                 if re.search(r'recent|latest|news|update|current', query_lower):
                     analysis["intent"] = "news"
@@ -96,8 +86,8 @@ class QueryAnalyzer:
                 analysis["search_terms"] = [query] + [f"{query} {suffix}" for suffix in ["explained", "details", "guide"]]
         
         except Exception as e:
-            logger.error(f"Error using Gemini for query analysis: {e}")
+            logger.error("Error using Gemini for query analysis: %s", e)
             # Fall back to basic analysis
         
-        logger.info(f"Query analysis results: {analysis}")
+        logger.debug("Query analysis results: %s", analysis)
         return analysis
\ No newline at end of file
@@ -0,0 +1,118 @@
+# agent/report_prompts.py
+import json
+from typing import Dict, List, Any
+
+# Shared by the single-pass and the hierarchical (map-reduce) report prompts
+REPORT_INSTRUCTIONS = """Create a detailed research report that:
+        1. Directly answers the original query
+        2. Synthesizes information from these sources
+        3. Resolves any contradictions between sources
+        4. Provides nuanced analysis appropriate to the query
+        5. Clearly cites sources using [1], [2], etc. with a numbered references section at the end
+        6. Follows high-quality academic writing standards
+        
+        Format the report in Markdown with these sections:
+        - Executive Summary (brief answer to the query)
+        - Background
+        - Key Findings
+        - Analysis
+        - Conclusion
+        - References (numbered list of sources with URLs)
+        
+        Write in a professional, objective tone."""
+
+
+def build_report_prompt(query: str, relevant_contents: List[Dict[str, Any]]) -> str:
+    """Single-pass prompt over every source (at most HIERARCHICAL_SYNTHESIS_MIN_SOURCES)."""
+    sources_info = []
+    for content in relevant_contents:
+        sources_info.append({
+            "url": content["url"],
+            "title": content.get("title", "Untitled"),
+            "summary": content.get("summary", ""),
+            "key_insights": content.get("key_insights", []),
+            "relevance_score": content.get("relevance_score", 0),
+            "reliability_score": content.get("reliability_score", 0)
+        })
+    
+    return f"""
+        I need you to create a comprehensive research report answering this query: "{query}"
+        
+        Here are key sources I've gathered, sorted by relevance:
+        
+        {json.dumps(sources_info, indent=2)}
+        
+        {REPORT_INSTRUCTIONS}
+        """
+
+
+def build_group_prompt(query: str, relevant_contents: List[Dict[str, Any]], group: List[int]) -> str:
+    """Map step prompt: summarize one topic group, citing sources by their global numbers."""
+    sources_info = [
+        {
+            "citation": f"[{i + 1}]",
+            "url": relevant_contents[i]["url"],
+            "title": relevant_contents[i].get("title", "Untitled"),
+            "summary": relevant_contents[i].get("summary", ""),
+            "key_insights": relevant_contents[i].get("key_insights", []),
+            "reliability_score": relevant_contents[i].get("reliability_score", 0)
+        }
+        for i in group
+    ]
+    
+    return f"""
+        I am researching this query: "{query}"
+        
+        Here are related sources, each with a fixed citation number:
+        
+        {json.dumps(sources_info, indent=2)}
+        
+        Write a dense summary (150-250 words) of what these sources say that is relevant to the query,
+        noting where they agree or contradict each other. Cite every claim with the citation numbers
+        exactly as given, e.g. [3]. Do not renumber sources and do not add a references list.
+        """
+
+
+def fallback_group_summary(relevant_contents: List[Dict[str, Any]], group: List[int]) -> str:
+    """The group's raw insights with their citations, for when the map call fails."""
+    return "\n".join(
+        f"- {insight} [{i + 1}]"
+        for i in group
+        for insight in relevant_contents[i].get("key_insights", [])
+    )
+
+
+def build_hierarchical_prompt(query: str, relevant_contents: List[Dict[str, Any]],
+                              groups: List[List[int]], summaries: List[str]) -> str:
+    """
+    Reduce step prompt: the group summaries plus the numbered reference list.
+    
+    Args:
+        query: Original search query
+        relevant_contents: Sources in citation order ([1] is relevant_contents[0])
+        groups: Source indices of each topic group
+        summaries: Map step summary of each group
+    """
+    group_sections = []
+    for n, (group, summary) in enumerate(zip(groups, summaries), 1):
+        citations = ", ".join(f"[{i + 1}]" for i in group)
+        group_sections.append(f"### Topic group {n} (sources {citations})\n{summary}")
+    
+    references = "\n".join(
+        f"[{i + 1}] {content.get('title', 'Untitled')} - {content['url']}"
+        for i, content in enumerate(relevant_contents)
+    )
+    
+    return f"""
+        I need you to create a comprehensive research report answering this query: "{query}"
+        
+        I gathered {len(relevant_contents)} sources, grouped them by topic and summarized each group.
+        Source numbers are fixed: cite them exactly as they appear in the summaries.
+        
+        {chr(10).join(group_sections)}
+        
+        Numbered sources (reproduce these numbers and URLs in the References section):
+        {references}
+        
+        {REPORT_INSTRUCTIONS}
+        """
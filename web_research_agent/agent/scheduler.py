@@ -0,0 +1,153 @@
+# agent/scheduler.py
+import heapq
+import logging
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from urllib.parse import urlparse
+from config import MAX_PAGES_TO_SCRAPE, MAX_CONCURRENT_FETCHES, MIN_RELEVANT_SOURCES, RELEVANCE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+class ScrapeScheduler:
+    """
+    Adaptive scrape/analyze loop over a priority queue of candidate URLs.
+
+    Several fetches are kept in flight, priorities are revised as analyses for a
+    domain come back, and the loop stops as soon as enough sources clear the
+    synthesizer's relevance threshold.
+    """
+
+    # How strongly live analysis scores for a domain move its remaining URLs
+    DOMAIN_SCORE_WEIGHT = 0.5
+
+    def __init__(
+        self,
+        fetch_fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+        analyze_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+        max_pages: int = MAX_PAGES_TO_SCRAPE,
+        max_in_flight: int = MAX_CONCURRENT_FETCHES,
+        min_relevant: int = MIN_RELEVANT_SOURCES,
+        relevance_threshold: float = RELEVANCE_THRESHOLD
+    ):
+        self.fetch_fn = fetch_fn
+        self.analyze_fn = analyze_fn
+        self.max_pages = max_pages
+        self.max_in_flight = max_in_flight
+        self.min_relevant = min_relevant
+        self.relevance_threshold = relevance_threshold
+
+        self.queue = []
+        self.counter = itertools.count()
+        self.domain_scores = {}
+
+    def run(self, candidates: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Scrape and analyze candidates in priority order until enough relevant sources are found.
+
+        Args:
+            candidates: URL dicts from SearchTool.extract_urls, with initial_relevance set
+
+        Returns:
+            Tuple of (scraped contents, analyzed contents)
+        """
+        for url_data in candidates:
+            self._push(url_data)
+
+        scraped_contents = []
+        analyzed_contents = []
+        relevant_count = 0
+        submitted = 0
+        in_flight = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while True:
+                # Top up the in-flight set unless we already have enough good sources
+                while (relevant_count < self.min_relevant and submitted < self.max_pages
+                       and len(in_flight) < self.max_in_flight):
+                    url_data = self._pop(busy_domains={d for d, _ in in_flight.values()})
+                    if url_data is None:
+                        break
+                    future = executor.submit(self._process, url_data)
+                    in_flight[future] = (self._domain(url_data["url"]), url_data)
+                    submitted += 1
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    domain, url_data = in_flight.pop(future)
+                    scraped_data, analysis = future.result()
+                    if scraped_data is not None:
+                        scraped_contents.append(scraped_data)
+                    if analysis is not None:
+                        analyzed_contents.append(analysis)
+                        self.domain_scores.setdefault(domain, []).append(analysis.get("relevance_score", 0))
+                        if analysis.get("relevance_score", 0) > self.relevance_threshold:
+                            relevant_count += 1
+                        self._reprioritize()
+
+        if relevant_count >= self.min_relevant:
+            logger.info("Stopped after %s pages: found %s relevant sources", submitted, relevant_count)
+        else:
+            logger.info("Exhausted %s pages with %s relevant sources", submitted, relevant_count)
+
+        return scraped_contents, analyzed_contents
+
+    def _process(self, url_data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Fetch and analyze one URL on a worker thread."""
+        try:
+            scraped_data = self.fetch_fn(url_data)
+        except Exception as e:
+            logger.error("Error scraping %s: %s", url_data['url'], e)
+            return None, None
+
+        if not scraped_data or not scraped_data.get("success") or not scraped_data.get("content"):
+            return scraped_data, None
+
+        try:
+            return scraped_data, self.analyze_fn(scraped_data)
+        except Exception as e:
+            logger.error("Error analyzing %s: %s", url_data['url'], e)
+            return scraped_data, None
+
+    def priority(self, url_data: Dict[str, Any]) -> float:
+        """Current priority of a candidate: search relevance adjusted by domain history and this run's results."""
+        priority = url_data.get("initial_relevance", 0) + url_data.get("domain_score", 0)
+
+        scores = self.domain_scores.get(self._domain(url_data["url"]))
+        if scores:
+            priority += self.DOMAIN_SCORE_WEIGHT * (sum(scores) / len(scores) - self.relevance_threshold)
+
+        return priority
+
+    def _push(self, url_data: Dict[str, Any]):
+        heapq.heappush(self.queue, (-self.priority(url_data), next(self.counter), url_data))
+
+    def _reprioritize(self):
+        """Recompute every queued priority after new domain results arrive."""
+        self.queue = [(-self.priority(url_data), seq, url_data) for _, seq, url_data in self.queue]
+        heapq.heapify(self.queue)
+
+    def _pop(self, busy_domains: set) -> Optional[Dict[str, Any]]:
+        """Pop the highest-priority candidate whose domain has no fetch in flight."""
+        deferred = []
+        chosen = None
+
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            if self._domain(entry[2]["url"]) in busy_domains:
+                deferred.append(entry)
+                continue
+            chosen = entry[2]
+            break
+
+        for entry in deferred:
+            heapq.heappush(self.queue, entry)
+
+        return chosen
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlparse(url).netloc.lower()
@@ -7,21 +7,36 @@ from urllib.parse import urlparse
 import random
 from bs4 import BeautifulSoup
 import re
-from agent.utils import clean_text, extract_main_content, rate_limit
-from config import USER_AGENT
+from agent.utils import rate_limit
+from agent.text import clean_text, extract_main_content
+from agent.date_extractor import extract_publication_date
+from agent.cache import TTLCache
+from agent.domain_stats import DomainStats
+from agent.warc import WarcArchive
+from config import USER_AGENT, ROBOTS_CACHE_TTL, HOST_MIN_INTERVAL
 
 logger = logging.getLogger(__name__)
 
 class Scraper:
     """Web page scraper to extract content from URLs."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[TTLCache] = None, domain_stats: Optional[DomainStats] = None,
+                 politeness: Optional[Any] = None, archive: Optional[WarcArchive] = None, replay: bool = False):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': USER_AGENT,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5'
         })
+        self.cache = cache if cache is not None else TTLCache()
+        self.domain_stats = domain_stats
+        # Work queue whose reserve_host() spaces requests to a host across all workers
+        self.politeness = politeness
+        # Every live fetch is written to the archive; in replay mode pages are read back from it instead
+        if replay and archive is None:
+            raise ValueError("Replay mode needs a WarcArchive")
+        self.archive = archive
+        self.replay = replay
         logger.info("Scraper initialized")
     
     def is_allowed_by_robots(self, url: str) -> bool:
@@ -29,112 +44,184 @@ class Scraper:
         Check if specific URL is allowed by robots.txt
         """
         try:
-            from urllib.parse import urlparse
             parsed_url = urlparse(url)
             base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
             path = parsed_url.path
             
-            robots_url = f"{base_url}/robots.txt"
+            # robots.txt is fetched once per site and reused until it expires
+            robots_text = self.cache.get("robots", base_url)
+            if robots_text is None:
+                robots_url = f"{base_url}/robots.txt"
+                response = self.session.get(robots_url, timeout=5)
+                robots_text = response.text if response.status_code == 200 else ""
+                self.cache.set("robots", base_url, robots_text, ROBOTS_CACHE_TTL)
             
-            response = self.session.get(robots_url, timeout=5)
-            if response.status_code == 200:
-                # Parse robots.txt for the path
-                lines = response.text.splitlines()
-                user_agent_match = False
+            # Parse robots.txt for the path
+            lines = robots_text.splitlines()
+            user_agent_match = False
+            
+            for line in lines:
+                line = line.strip()
+                
+                # Check for User-agent lines
+                if line.startswith('User-agent:'):
+                    agent = line.split(':', 1)[1].strip()
+                    # Match our user agent or wildcard
+                    if agent == '*' or agent in self.session.headers['User-Agent']:
+                        user_agent_match = True
+                    else:
+                        user_agent_match = False
                 
-                for line in lines:
-                    line = line.strip()
-                    
-                    # Check for User-agent lines
-                    if line.startswith('User-agent:'):
-                        agent = line.split(':', 1)[1].strip()
-                        # Match our user agent or wildcard
-                        if agent == '*' or agent in self.session.headers['User-Agent']:
-                            user_agent_match = True
-                        else:
-                            user_agent_match = False
-                    
-                    # Check disallow rules if we're in a matching user-agent section
-                    elif user_agent_match and line.startswith('Disallow:'):
-                        disallow_path = line.split(':', 1)[1].strip()
-                        if disallow_path and path.startswith(disallow_path):
-                            return False
+                # Check disallow rules if we're in a matching user-agent section
+                elif user_agent_match and line.startswith('Disallow:'):
+                    disallow_path = line.split(':', 1)[1].strip()
+                    if disallow_path and path.startswith(disallow_path):
+                        return False
             
             # If we didn't hit a disallow rule, it's allowed
             return True
         
         except Exception as e:
-            logger.warning(f"Error checking robots.txt for {url}: {e}")
+            logger.warning("Error checking robots.txt for %s: %s", url, e)
             return True  # Assume allowed if check fails
     
-    @rate_limit(min_time=2.0)
     def scrape_url(self, url: str) -> Dict[str, Any]:
         """
         Scrape content from a URL.
         
+        In replay mode the page is served from the WARC archive, with no
+        network access, robots.txt check or politeness delay.
+        
         Args:
             url: The URL to scrape
             
         Returns:
             Dict with scraped content, metadata, and status
         """
-        logger.info(f"Scraping URL: {url}")
-        
-        result = {
+        if self.replay:
+            return self._scrape_archived(url)
+        return self._scrape_live(url)
+    
+    @staticmethod
+    def _empty_result(url: str) -> Dict[str, Any]:
+        return {
             "url": url,
             "success": False,
             "content": "",
             "html": "",
             "title": "",
             "metadata": {},
+            "published_at": None,
             "error": None
         }
+    
+    def _scrape_archived(self, url: str) -> Dict[str, Any]:
+        """Re-run extraction on the archived response for a URL."""
+        result = self._empty_result(url)
+        
+        response = self.archive.lookup(url)
+        if response is None:
+            logger.warning("URL not in WARC archive: %s", url)
+            result["error"] = "URL not in WARC archive"
+            return result
+        
+        try:
+            response.raise_for_status()
+            self._parse_page(result, response.text)
+        except Exception as e:
+            logger.error("Error scraping archived %s: %s", url, e)
+            result["error"] = str(e)
+        return result
+    
+    @rate_limit(min_time=2.0)
+    def _scrape_live(self, url: str) -> Dict[str, Any]:
+        """Fetch a URL over the network and extract its content."""
+        logger.debug("Scraping URL: %s", url)
+        
+        result = self._empty_result(url)
         
         # Check if allowed by robots.txt
         if not self.is_allowed_by_robots(url):
-            logger.warning(f"URL not allowed by robots.txt: {url}")
+            logger.warning("URL not allowed by robots.txt: %s", url)
             result["error"] = "URL not allowed by robots.txt"
+            # Not recorded: a disallowed path says nothing about the domain's other pages
             return result
         
+        latency = None
+        
         try:
             # Add random delay to be respectful
             time.sleep(random.uniform(1.0, 3.0))
             
+            # Other workers may be fetching from the same host
+            if self.politeness is not None:
+                delay = self.politeness.reserve_host(urlparse(url).netloc.lower(), HOST_MIN_INTERVAL)
+                if delay > 0:
+                    time.sleep(delay)
+            
             # Fetch the page
-            response = self.session.get(url, timeout=10)
+            fetch_start = time.time()
+            try:
+                response = self.session.get(url, timeout=10)
+            finally:
+                latency = time.time() - fetch_start
+            if self.archive is not None:
+                self.archive.record(url, response)
             response.raise_for_status()
             
-            # Store the HTML
-            result["html"] = response.text
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract title
-            title_tag = soup.find('title')
-            result["title"] = title_tag.text.strip() if title_tag else ""
-            
-            # Extract metadata
-            result["metadata"] = self._extract_metadata(soup)
-            
-            # Extract main content
-            article_content = self._extract_article_content(soup)
-            if article_content:
-                result["content"] = clean_text(article_content)
-            else:
-                # Fall back to simple extraction
-                main_content = extract_main_content(response.text)
-                result["content"] = clean_text(main_content)
-            
-            result["success"] = True
-            logger.info(f"Successfully scraped {url}, content length: {len(result['content'])}")
+            self._parse_page(result, response.text)
         
         except Exception as e:
-            logger.error(f"Error scraping {url}: {str(e)}")
+            logger.error("Error scraping %s: %s", url, e)
             result["error"] = str(e)
         
+        self._record_fetch(result, latency)
         return result
     
+    def _parse_page(self, result: Dict[str, Any], html: str):
+        """Fill result with the title, metadata, publication date and main text of a page."""
+        # Store the HTML
+        result["html"] = html
+        
+        # Parse with BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Extract title
+        title_tag = soup.find('title')
+        result["title"] = title_tag.text.strip() if title_tag else ""
+        
+        # Extract metadata
+        result["metadata"] = self._extract_metadata(soup)
+        
+        # Publication date from structured data, falling back to the top of the page text
+        published_at = extract_publication_date(soup)
+        if published_at:
+            result["published_at"] = published_at
+            result["metadata"]["detected_date"] = published_at.isoformat()
+        
+        # Extract main content
+        article_content = self._extract_article_content(soup)
+        if article_content:
+            result["content"] = clean_text(article_content)
+        else:
+            # Fall back to simple extraction
+            main_content = extract_main_content(html)
+            result["content"] = clean_text(main_content)
+        
+        result["success"] = True
+        logger.info("Successfully scraped %s, content length: %s", result['url'], len(result['content']))
+    
+    def _record_fetch(self, result: Dict[str, Any], latency: Optional[float] = None):
+        """Feed the outcome of a fetch into the domain reputation table."""
+        if self.domain_stats is not None:
+            self.domain_stats.record_fetch(
+                result["url"],
+                success=result["success"],
+                latency=latency,
+                content_length=len(result["content"]),
+                error=result["error"]
+            )
+    
     def _extract_metadata(self, soup: BeautifulSoup) -> Dict[str, str]:
         """Extract metadata from page."""
         metadata = {}
@@ -146,21 +233,6 @@ class Scraper:
             elif meta.get('property'):
                 metadata[meta.get('property')] = meta.get('content', '')
         
-        # Try to get publication date
-        date_patterns = [
-            r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})',  # YYYY-MM-DD
-            r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})',  # MM-DD-YYYY or DD-MM-YYYY
-        ]
-        
-        # Look for dates in specific elements or attributes
-        for pattern in date_patterns:
-            date_elements = soup.find_all(string=re.compile(pattern))
-            if date_elements:
-                match = re.search(pattern, date_elements[0])
-                if match:
-                    metadata['detected_date'] = match.group(1)
-                    break
-        
         return metadata
     
     def _extract_article_content(self, soup: BeautifulSoup) -> str:
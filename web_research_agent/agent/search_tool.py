@@ -2,25 +2,27 @@
 import logging
 import requests
 import json
-from typing import Dict, List, Any
-from config import SERPER_API_KEY, MAX_SEARCH_RESULTS
-from agent.utils import rate_limit
+from typing import Dict, List, Any, Optional
+from config import SERPER_API_KEY, MAX_SEARCH_RESULTS, SERPER_MAX_RESULTS, SEARCH_CACHE_TTL, NEWS_CACHE_TTL
+from agent.utils import rate_limit, normalize_query, dedupe_queries
+from agent.cache import TTLCache
+from agent.corpus import Corpus
 
 logger = logging.getLogger(__name__)
 
 class SearchTool:
     """Interface for web search operations using Serper API."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[TTLCache] = None):
         self.api_key = SERPER_API_KEY
         self.base_url = "https://google.serper.dev/search"
         self.headers = {
             'X-API-KEY': self.api_key,
             'Content-Type': 'application/json'
         }
+        self.cache = cache if cache is not None else TTLCache()
         logger.info("SearchTool initialized with Serper API")
     
-    @rate_limit(min_time=1.0)
     def search(self, query: str, result_type: str = "search", num_results: int = MAX_SEARCH_RESULTS) -> Dict[str, Any]:
         """
         Perform a web search using Serper API.
@@ -33,50 +35,143 @@ class SearchTool:
         Returns:
             Dict containing search results
         """
-        logger.info(f"Searching for: {query} (type: {result_type})")
-        
-        payload = {
-            "q": query,
-            "gl": "us",
-            "hl": "en",
-            "num": min(num_results, MAX_SEARCH_RESULTS)
-        }
+        logger.info("Searching for: %s (type: %s)", query, result_type)
         
-        try:
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            results = response.json()
-            
-            logger.info(f"Received {len(results.get('organic', []))} search results")
-            return results
+        results = self._run_payloads([self._build_payload(query, result_type, num_results)])[0]
         
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Search API error: {str(e)}")
-            return {"error": str(e), "organic": []}
+        logger.info("Received %s search results", len(results.get('organic', [])))
+        return results
     
     def search_news(self, query: str, num_results: int = MAX_SEARCH_RESULTS) -> Dict[str, Any]:
         """Perform a news search."""
-        logger.info(f"Searching news for: {query}")
+        logger.info("Searching news for: %s", query)
+        
+        results = self._run_payloads([self._build_payload(query, "news", num_results)])[0]
+        
+        logger.info("Received %s news results", len(results.get('news', [])))
+        return results
+    
+    def search_batch(self, queries: List[str], include_news: bool = False, num_results: int = MAX_SEARCH_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Run the searches for several queries in a single Serper request.
+        
+        Args:
+            queries: The search query strings; duplicates are dropped
+            include_news: Also run a news search for every query
+            num_results: Number of results to return per search
+            
+        Returns:
+            List of search result dicts, each query's organic results followed by its news results
+        """
+        payloads = []
+        for query in dedupe_queries(queries):
+            payloads.append(self._build_payload(query, "search", num_results))
+            if include_news:
+                payloads.append(self._build_payload(query, "news", num_results))
         
+        logger.info("Searching %s queries in one batch", len(payloads))
+        return self._run_payloads(payloads)
+    
+    def _build_payload(self, query: str, result_type: str, num_results: int) -> Dict[str, Any]:
+        """Build the Serper request body for one search."""
         payload = {
             "q": query,
             "gl": "us",
             "hl": "en",
-            "type": "news",
-            "num": min(num_results, MAX_SEARCH_RESULTS)
+            "num": min(num_results, SERPER_MAX_RESULTS)
         }
+        if result_type == "news":
+            payload["type"] = "news"
+        return payload
+    
+    def _cache_key(self, payload: Dict[str, Any]) -> str:
+        """Key a payload on its normalized (q, type, gl, hl, num)."""
+        return json.dumps({
+            "q": normalize_query(payload["q"]),
+            "type": payload.get("type", "search"),
+            "gl": payload["gl"],
+            "hl": payload["hl"],
+            "num": payload["num"]
+        }, sort_keys=True)
+    
+    @staticmethod
+    def _result_key(payload: Dict[str, Any]) -> str:
+        return "news" if payload.get("type") == "news" else "organic"
+    
+    def _is_result(self, payload: Dict[str, Any], result: Any) -> bool:
+        """True if result is a real answer to payload, not an error object like {"message": ...}."""
+        return isinstance(result, dict) and isinstance(result.get(self._result_key(payload)), list)
+    
+    @rate_limit(min_time=1.0)
+    def _post(self, body: Any) -> Any:
+        """Send a single payload or a batch (JSON array) of payloads to Serper."""
+        response = requests.post(self.base_url, headers=self.headers, json=body)
+        response.raise_for_status()
+        return response.json()
+    
+    def _run_payloads(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Resolve payloads from the cache, sending all misses to Serper in one request.
         
-        try:
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            results = response.json()
-            
-            logger.info(f"Received {len(results.get('news', []))} news results")
+        If the batch request fails or comes back malformed, the misses are sent
+        one request each, so one bad batch does not cost every search. A search
+        whose batch slot holds an error object instead of results is retried the
+        same way, and only real results are cached.
+        
+        Returns:
+            List of search result dicts in the same order as payloads
+        """
+        results = [None] * len(payloads)
+        
+        # Group the misses by cache key so repeated payloads are only sent once
+        pending = {}
+        for i, payload in enumerate(payloads):
+            key = self._cache_key(payload)
+            cached = self.cache.get("serper", key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+        
+        if not pending:
+            logger.info("All %s searches served from cache", len(payloads))
             return results
         
-        except requests.exceptions.RequestException as e:
-            logger.error(f"News search API error: {str(e)}")
-            return {"error": str(e), "news": []}
+        keys = list(pending)
+        batch = [payloads[pending[key][0]] for key in keys]
+        logger.info("Sending %s searches to Serper (%s cache hits)",
+                    len(batch), len(payloads) - sum(len(v) for v in pending.values()))
+        
+        batch_results = [None] * len(batch)
+        if len(batch) > 1:
+            try:
+                response = self._post(batch)
+                if not isinstance(response, list) or len(response) != len(batch):
+                    raise ValueError("Unexpected batch response shape from Serper")
+                batch_results = response
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning("Batch search failed (%s), sending %s searches one at a time", e, len(batch))
+        
+        for key, payload, result in zip(keys, batch, batch_results):
+            result_key = self._result_key(payload)
+            if not self._is_result(payload, result):
+                # Missing or an error object in its batch slot: ask for this search on its own
+                try:
+                    result = self._post(payload)
+                    if not self._is_result(payload, result):
+                        raise ValueError(f"Serper returned no {result_key} results: {str(result)[:200]}")
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.error("Search API error: %s", e)
+                    for i in pending[key]:
+                        results[i] = {"error": str(e), result_key: []}
+                    continue
+            
+            ttl = NEWS_CACHE_TTL if payload.get("type") == "news" else SEARCH_CACHE_TTL
+            self.cache.set("serper", key, result, ttl)
+            for i in pending[key]:
+                results[i] = result
+        
+        return results
     
     def extract_urls(self, search_results: Dict[str, Any]) -> List[Dict[str, str]]:
         """
@@ -109,5 +204,53 @@ class SearchTool:
                         "published_date": result.get("date", "")
                     })
         
-        logger.info(f"Extracted {len(urls)} URLs from search results")
-        return urls
\ No newline at end of file
+        logger.info("Extracted %s URLs from search results", len(urls))
+        return urls
+
+
+class OfflineSearchTool(SearchTool):
+    """SearchTool drop-in that answers queries from the local corpus instead of Serper."""
+    
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
+        logger.info("OfflineSearchTool initialized with %s indexed pages", corpus.page_count())
+    
+    def search(self, query: str, result_type: str = "search", num_results: int = MAX_SEARCH_RESULTS) -> Dict[str, Any]:
+        """Search the local corpus, returning results in Serper's organic format."""
+        logger.info("Searching corpus for: %s", query)
+        
+        organic = [
+            {"link": hit["url"], "title": hit["title"], "snippet": hit["snippet"]}
+            for hit in self.corpus.search(query, num_results)
+        ]
+        
+        logger.info("Received %s corpus results", len(organic))
+        return {"organic": organic}
+    
+    def search_news(self, query: str, num_results: int = MAX_SEARCH_RESULTS) -> Dict[str, Any]:
+        """Search the local corpus for dated pages, returning results in Serper's news format."""
+        logger.info("Searching corpus news for: %s", query)
+        
+        news = [
+            {
+                "link": hit["url"],
+                "title": hit["title"],
+                "snippet": hit["snippet"],
+                "source": "corpus",
+                "date": hit["published_at"]
+            }
+            for hit in self.corpus.search(query, num_results)
+            if hit["published_at"]
+        ]
+        
+        logger.info("Received %s corpus news results", len(news))
+        return {"news": news}
+    
+    def search_batch(self, queries: List[str], include_news: bool = False, num_results: int = MAX_SEARCH_RESULTS) -> List[Dict[str, Any]]:
+        """Run the searches for several queries against the local corpus."""
+        results = []
+        for query in dedupe_queries(queries):
+            results.append(self.search(query, num_results=num_results))
+            if include_news:
+                results.append(self.search_news(query, num_results))
+        return results
@@ -0,0 +1,335 @@
+# agent/structured_output.py
+import json
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass, fields, MISSING
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+from agent.llm import get_dispatcher, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Response schemas in the OpenAPI subset accepted by Gemini's response_schema
+QUERY_ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "intent": {"type": "STRING"},
+        "search_terms": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "query_type": {"type": "STRING", "enum": ["factual", "exploratory", "news"]},
+        "time_sensitivity": {"type": "STRING", "enum": ["high", "medium", "low"]},
+    },
+    "required": ["intent", "search_terms", "query_type", "time_sensitivity"],
+}
+
+CONTENT_ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "relevance_score": {"type": "NUMBER"},
+        "reliability_score": {"type": "NUMBER"},
+        "key_insights": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "summary": {"type": "STRING"},
+    },
+    "required": ["relevance_score", "reliability_score", "key_insights", "summary"],
+}
+
+# Added to CONTENT_ANALYSIS_SCHEMA when the page has no detectable publication date
+FRESHNESS_PROPERTY = {"freshness_score": {"type": "NUMBER"}}
+
+
+@dataclass
+class QueryAnalysisResult:
+    intent: str
+    search_terms: List[str]
+    query_type: str
+    time_sensitivity: str
+
+
+@dataclass
+class ContentAnalysisResult:
+    relevance_score: float
+    reliability_score: float
+    key_insights: List[str]
+    summary: str
+    freshness_score: Optional[float] = None
+
+    def __post_init__(self):
+        # The schema fixes the type, not the range, so a reply of 7 or -1 is pulled back into [0, 1]
+        self.relevance_score = _clamp_score(self.relevance_score)
+        self.reliability_score = _clamp_score(self.reliability_score)
+        if self.freshness_score is not None:
+            self.freshness_score = _clamp_score(self.freshness_score)
+
+
+def _clamp_score(score: float) -> float:
+    return min(1.0, max(0.0, score))
+
+
+def _strip_code_fences(text: str) -> str:
+    """Extract JSON if it's wrapped in code blocks."""
+    if "```json" in text:
+        return text.split("```json")[1].split("```")[0]
+    if "```" in text:
+        return text.split("```")[1].split("```")[0]
+    return text
+
+
+def _trim_dangling(text: str, closer: str) -> str:
+    """Drop a trailing comma, half-written key or key without value before closing a container."""
+    while True:
+        trimmed = text.rstrip()
+        trimmed = re.sub(r',$', '', trimmed)
+        if closer == '}':
+            # {"a": 1, "b"   or   {"a": 1, "b":
+            trimmed = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?$', lambda m: '' if m.group(1) == ',' else '{', trimmed)
+        # Partially written literal: tru, fals, nul
+        trimmed = re.sub(r'([\[{,:])\s*(?:t|tr|tru|f|fa|fal|fals|n|nu|nul)$', r'\1', trimmed)
+        if trimmed == text:
+            return text
+        text = trimmed
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Single-pass repair of slightly malformed JSON.
+
+    Scans from the first '{' or '[' keeping a stack of open containers, and
+    fixes what LLMs typically get wrong: prose before or after the JSON,
+    trailing commas, raw newlines inside strings, mismatched closers, and
+    output truncated mid-value (open strings and containers are closed).
+
+    Returns:
+        Repaired JSON text, or None if there is no JSON-looking content at all
+    """
+    match = re.search(r'[{\[]', text)
+    if not match:
+        return None
+
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+
+    for ch in text[match.start():]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch == '\n':
+                ch = '\\n'
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            if not stack:
+                break
+            closer = stack.pop()
+            out = list(_trim_dangling(''.join(out), closer))
+            out.append(closer)
+            if not stack:
+                break
+        else:
+            out.append(ch)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+
+    repaired = ''.join(out)
+    for closer in reversed(stack):
+        repaired = _trim_dangling(repaired, closer) + closer
+    return repaired
+
+
+def parse_json_response(text: str) -> Tuple[Optional[Any], bool]:
+    """
+    Parse an LLM reply as JSON, repairing it if needed.
+
+    Returns:
+        Tuple of (parsed value or None, whether repair was needed)
+    """
+    candidate = _strip_code_fences(text).strip()
+    try:
+        return json.loads(candidate), False
+    except json.JSONDecodeError:
+        pass
+
+    repaired = repair_json(candidate) or repair_json(text)
+    if repaired is None:
+        return None, True
+    try:
+        return json.loads(repaired), True
+    except json.JSONDecodeError:
+        return None, True
+
+
+def coerce(value: Any, schema: Dict[str, Any]) -> Any:
+    """
+    Coerce a parsed value to a response schema.
+
+    Raises:
+        ValueError: if the value cannot be made to fit the schema
+    """
+    kind = schema.get("type", "").upper()
+
+    if kind == "OBJECT":
+        if not isinstance(value, dict):
+            raise ValueError(f"expected object, got {type(value).__name__}")
+        result = {}
+        for name, prop_schema in schema.get("properties", {}).items():
+            if name in value and value[name] is not None:
+                try:
+                    result[name] = coerce(value[name], prop_schema)
+                except ValueError:
+                    if name in schema.get("required", []):
+                        raise
+        return result
+
+    if kind == "ARRAY":
+        if isinstance(value, (str, int, float)):
+            value = [value]
+        if not isinstance(value, list):
+            raise ValueError(f"expected array, got {type(value).__name__}")
+        return [coerce(item, schema.get("items", {})) for item in value if item is not None]
+
+    if kind == "NUMBER":
+        if isinstance(value, bool):
+            raise ValueError("expected number, got bool")
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"expected finite number, got {value!r}")
+        return number
+
+    if kind == "STRING":
+        value = str(value).strip()
+        if "enum" in schema:
+            if value.lower() not in schema["enum"]:
+                raise ValueError(f"{value!r} not in {schema['enum']}")
+            value = value.lower()
+        return value
+
+    return value
+
+
+def build_result(result_type: Type[T], data: Any, schema: Dict[str, Any]) -> Optional[T]:
+    """Build a typed result dataclass from parsed JSON, or None if required fields are missing."""
+    try:
+        values = coerce(data, schema)
+    except (ValueError, TypeError):
+        return None
+
+    kwargs = {}
+    for f in fields(result_type):
+        if f.name in values:
+            kwargs[f.name] = values[f.name]
+        elif f.default is MISSING and f.default_factory is MISSING:
+            return None
+    return result_type(**kwargs)
+
+
+class StructuredOutputMetrics:
+    """Counters for how often structured LLM output needed repair or a retry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.clean = 0
+        self.repaired = 0
+        self.retried = 0
+        self.failed = 0
+        self.wasted_tokens = 0
+
+    def record(self, outcome: str, wasted_tokens: int = 0):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.wasted_tokens += wasted_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            calls = self.calls
+            return {
+                "calls": calls,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "retried": self.retried,
+                "failed": self.failed,
+                # Share of calls whose first reply was not valid schema-conforming JSON
+                "failed_parse_rate": (self.repaired + self.retried + self.failed) / calls if calls else 0.0,
+                "wasted_tokens": self.wasted_tokens,
+            }
+
+
+METRICS = StructuredOutputMetrics()
+
+
+class StructuredOutput:
+    """
+    Schema-constrained Gemini calls that return typed results.
+
+    Uses Gemini's JSON response mode with a response schema, repairs slightly
+    malformed replies locally, and only if that fails makes one targeted retry
+    that asks the model to fix its own reply rather than resending the prompt.
+    """
+
+    def __init__(self, metrics: StructuredOutputMetrics = METRICS):
+        self.llm = get_dispatcher()
+        self.metrics = metrics
+
+    def generate(self, model: Any, prompt: str, result_type: Type[T], schema: Dict[str, Any], priority: int) -> Optional[T]:
+        """
+        Ask the model for JSON matching schema and build a result_type from it.
+
+        Returns:
+            The typed result, or None if neither the reply, its repair, nor the retry fit the schema
+        """
+        self.metrics.record("calls")
+        generation_config = {"response_mime_type": "application/json", "response_schema": schema}
+
+        try:
+            response = self.llm.generate(model, prompt, priority=priority, generation_config=generation_config)
+            text = response.text
+        except Exception:
+            self.metrics.record("failed")
+            raise
+
+        data, repaired = parse_json_response(text)
+        result = build_result(result_type, data, schema) if data is not None else None
+        if result is not None:
+            self.metrics.record("repaired" if repaired else "clean")
+            return result
+
+        logger.warning("Unusable JSON from Gemini for %s, retrying once", result_type.__name__)
+        retry_prompt = f"""
+        The following reply was supposed to be a JSON object matching the response schema but could not be used.
+        Return only the corrected JSON object, keeping all of its information.
+
+        {text}
+        """
+        try:
+            response = self.llm.generate(model, retry_prompt, priority=priority, generation_config=generation_config)
+            data, _ = parse_json_response(response.text)
+            result = build_result(result_type, data, schema) if data is not None else None
+        except Exception as e:
+            logger.error("Structured output retry failed: %s", e)
+            result = None
+
+        if result is not None:
+            # The first reply was paid for but unusable
+            self.metrics.record("retried", wasted_tokens=estimate_tokens(prompt))
+            return result
+
+        self.metrics.record("failed", wasted_tokens=estimate_tokens(prompt) + estimate_tokens(retry_prompt))
+        logger.warning("Failed to parse JSON from Gemini response for %s", result_type.__name__)
+        return None
@@ -2,11 +2,19 @@
 import logging
 from typing import Dict, List, Any
 import os
-import json
 from datetime import datetime
 import google.generativeai as genai
-from config import GEMINI_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    GEMINI_API_KEY, RELEVANCE_THRESHOLD, HIERARCHICAL_SYNTHESIS_MIN_SOURCES,
+    SYNTHESIS_GROUP_SIZE, SYNTHESIS_MAX_WORKERS
+)
 from agent.utils import sanitize_filename
+from agent.clustering import cluster_sources
+from agent.report_prompts import (
+    build_report_prompt, build_group_prompt, build_hierarchical_prompt, fallback_group_summary
+)
+from agent.llm import get_dispatcher, PRIORITY_SYNTHESIS, PRIORITY_SUMMARY
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +24,9 @@ class Synthesizer:
     def __init__(self, reports_dir="reports"):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-1.5-pro')
+        # Cheaper model for the per-group map step of hierarchical synthesis
+        self.map_model = genai.GenerativeModel('gemini-1.5-flash')
+        self.llm = get_dispatcher()
         self.reports_dir = reports_dir
         
         # Ensure reports directory exists
@@ -35,55 +46,22 @@ class Synthesizer:
         Returns:
             Dict with report details and path to saved report file
         """
-        logger.info(f"Synthesizing report for query: {query}")
+        logger.info("Synthesizing report for query: %s", query)
         
         # Filter for relevant content only
-        relevant_contents = [c for c in analyzed_contents if c.get("relevance_score", 0) > 0.4]
-        logger.info(f"Using {len(relevant_contents)} relevant sources out of {len(analyzed_contents)} total")
+        relevant_contents = [c for c in analyzed_contents if c.get("relevance_score", 0) > RELEVANCE_THRESHOLD]
+        logger.info("Using %s relevant sources out of %s total", len(relevant_contents), len(analyzed_contents))
         
         # Sort by relevance score
         relevant_contents.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
         
-        # Prepare input for Gemini
-        sources_info = []
-        for i, content in enumerate(relevant_contents[:10]):  # Limit to top 10 sources
-            sources_info.append({
-                "url": content["url"],
-                "title": content.get("title", "Untitled"),
-                "summary": content.get("summary", ""),
-                "key_insights": content.get("key_insights", []),
-                "relevance_score": content.get("relevance_score", 0),
-                "reliability_score": content.get("reliability_score", 0)
-            })
-        
-        prompt = f"""
-        I need you to create a comprehensive research report answering this query: "{query}"
-        
-        Here are key sources I've gathered, sorted by relevance:
-        
-        {json.dumps(sources_info, indent=2)}
-        
-        Create a detailed research report that:
-        1. Directly answers the original query
-        2. Synthesizes information from these sources
-        3. Resolves any contradictions between sources
-        4. Provides nuanced analysis appropriate to the query
-        5. Clearly cites sources using [1], [2], etc. with a numbered references section at the end
-        6. Follows high-quality academic writing standards
-        
-        Format the report in Markdown with these sections:
-        - Executive Summary (brief answer to the query)
-        - Background
-        - Key Findings
-        - Analysis
-        - Conclusion
-        - References (numbered list of sources with URLs)
-        
-        Write in a professional, objective tone.
-        """
+        if len(relevant_contents) > HIERARCHICAL_SYNTHESIS_MIN_SOURCES:
+            prompt = self._build_hierarchical_prompt(query, relevant_contents)
+        else:
+            prompt = self._build_prompt(query, relevant_contents)
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self.llm.generate(self.model, prompt, priority=PRIORITY_SYNTHESIS)
             report_content = response.text
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -104,7 +82,7 @@ Sources: {len(relevant_contents)}
             with open(report_path, "w", encoding="utf-8") as f:
                 f.write(report_content)
             
-            logger.info(f"Report saved to {report_path}")
+            logger.info("Report saved to %s", report_path)
             
             return {
                 "query": query,
@@ -115,9 +93,44 @@ Sources: {len(relevant_contents)}
             }
         
         except Exception as e:
-            logger.error(f"Error synthesizing report: {e}")
+            logger.error("Error synthesizing report: %s", e)
             return {
                 "query": query,
                 "error": str(e),
                 "report_content": f"Error generating report: {str(e)}"
-            }
\ No newline at end of file
+            }
+    
+    def _build_prompt(self, query: str, relevant_contents: List[Dict[str, Any]]) -> str:
+        """Single-pass prompt over every source (at most HIERARCHICAL_SYNTHESIS_MIN_SOURCES)."""
+        return build_report_prompt(query, relevant_contents)
+    
+    def _build_hierarchical_prompt(self, query: str, relevant_contents: List[Dict[str, Any]]) -> str:
+        """
+        Map-reduce prompt for large source sets.
+        
+        Sources get fixed citation numbers, are grouped by topic, and each group is
+        summarized by a parallel map call; the returned reduce prompt only carries
+        the group summaries and the numbered reference list.
+        """
+        groups = cluster_sources(relevant_contents, SYNTHESIS_GROUP_SIZE)
+        logger.info("Hierarchical synthesis: %s sources in %s topic groups", len(relevant_contents), len(groups))
+        
+        with ThreadPoolExecutor(max_workers=SYNTHESIS_MAX_WORKERS) as executor:
+            summaries = list(executor.map(
+                lambda group: self._summarize_group(query, relevant_contents, group), groups
+            ))
+        
+        return build_hierarchical_prompt(query, relevant_contents, groups, summaries)
+    
+    def _summarize_group(self, query: str, relevant_contents: List[Dict[str, Any]], group: List[int]) -> str:
+        """Map step: summarize one topic group, citing sources by their global numbers."""
+        prompt = build_group_prompt(query, relevant_contents, group)
+        
+        try:
+            response = self.llm.generate(self.map_model, prompt, priority=PRIORITY_SUMMARY)
+            return response.text.strip()
+        
+        except Exception as e:
+            logger.error("Error summarizing source group %s: %s", [i + 1 for i in group], e)
+            # Fall back to the raw insights so the group still reaches the reduce step
+            return fallback_group_summary(relevant_contents, group)
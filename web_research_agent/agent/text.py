@@ -0,0 +1,137 @@
+# agent/text.py
+import unicodedata
+from typing import Iterable, Iterator
+
+# Punctuation kept by clean_text; every other non-word, non-space character becomes a space
+_KEPT_PUNCTUATION = frozenset('.,;:?!\'"()-')
+
+
+class _CharFilterTable(dict):
+    """
+    str.translate table that maps characters outside [\\w\\s.,;:?!'"()-] to a space.
+
+    Entries are computed on first sight and memoized, so the table only ever
+    holds characters that actually occur in scraped text.
+    """
+
+    def __missing__(self, codepoint: int):
+        char = chr(codepoint)
+        # Same membership test as the regex class: \w is isalnum() or '_', \s is isspace()
+        if char.isalnum() or char == '_' or char.isspace() or char in _KEPT_PUNCTUATION:
+            value = codepoint
+        else:
+            value = ' '
+        self[codepoint] = value
+        return value
+
+
+_CHAR_FILTER = _CharFilterTable()
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapse whitespace runs to single spaces and strip the ends."""
+    return ' '.join(text.split())
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text content."""
+    if not text:
+        return ""
+
+    # ASCII text is already NFKC-normalized; skip the per-character quick check
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text)
+    text = collapse_whitespace(text)
+    return text.translate(_CHAR_FILTER)
+
+
+def iter_clean_text(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Streaming clean_text: ''.join(iter_clean_text(chunks)) == clean_text(''.join(chunks)).
+
+    Each chunk is only processed up to its last whitespace character, so words
+    and NFKC sequences split across chunk boundaries are normalized whole.
+    """
+    pending = []
+    emitted = False
+
+    for chunk in chunks:
+        cut = len(chunk)
+        while cut > 0 and not chunk[cut - 1].isspace():
+            cut -= 1
+        if cut == 0:
+            pending.append(chunk)
+            continue
+
+        pending.append(chunk[:cut])
+        cleaned = clean_text(''.join(pending))
+        pending = [chunk[cut:]]
+        if cleaned:
+            yield (' ' + cleaned) if emitted else cleaned
+            emitted = True
+
+    cleaned = clean_text(''.join(pending))
+    if cleaned:
+        yield (' ' + cleaned) if emitted else cleaned
+
+
+def _strip_blocks(html: str, open_tag: str, close_tag: str) -> str:
+    """
+    Replace each open_tag...close_tag block with a space using str.find.
+
+    Equivalent to re.sub(r'<tag[^>]*>.*?</tag>', ' ', html, flags=re.DOTALL) but
+    linear: once no closing tag remains, no later block can match either.
+    """
+    parts = []
+    pos = 0
+
+    while True:
+        start = html.find(open_tag, pos)
+        if start == -1:
+            break
+        open_end = html.find('>', start + len(open_tag))
+        if open_end == -1:
+            break
+        close_start = html.find(close_tag, open_end + 1)
+        if close_start == -1:
+            break
+        parts.append(html[pos:start])
+        parts.append(' ')
+        pos = close_start + len(close_tag)
+
+    if not parts:
+        return html
+    parts.append(html[pos:])
+    return ''.join(parts)
+
+
+def strip_tags(html: str) -> str:
+    """Replace every <...> tag with a space; equivalent to re.sub(r'<[^>]*>', ' ', html)."""
+    parts = []
+    pos = 0
+
+    while True:
+        start = html.find('<', pos)
+        if start == -1:
+            break
+        end = html.find('>', start + 1)
+        if end == -1:
+            break
+        parts.append(html[pos:start])
+        parts.append(' ')
+        pos = end + 1
+
+    if not parts:
+        return html
+    parts.append(html[pos:])
+    return ''.join(parts)
+
+
+def extract_main_content(html_content: str) -> str:
+    """
+    Extract the main content from HTML, removing boilerplate.
+    This is a simplified version - in production use a library like newspaper3k or trafilatura.
+    """
+    html_content = _strip_blocks(html_content, '<script', '</script>')
+    html_content = _strip_blocks(html_content, '<style', '</style>')
+    return collapse_whitespace(strip_tags(html_content))
@@ -1,49 +1,29 @@
 # agent/utils.py
 import logging
 import re
+import threading
 import time
 from typing import Dict, Any, List
-import unicodedata
+from datetime import datetime
+# Text normalization lives in agent.text; re-exported here for existing callers
+from agent.text import clean_text, extract_main_content
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-def clean_text(text: str) -> str:
-    """Clean and normalize text content."""
-    if not text:
-        return ""
-    
-    # Normalize unicode characters
-    text = unicodedata.normalize('NFKC', text)
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Remove special characters that might interfere with processing
-    text = re.sub(r'[^\w\s.,;:?!\'\"()-]', ' ', text)
-    
-    return text
+def normalize_query(query: str) -> str:
+    """Normalize a search query for comparison and cache keys."""
+    return ' '.join(query.lower().split())
 
-def extract_main_content(html_content: str) -> str:
-    """
-    Extract the main content from HTML, removing boilerplate.
-    This is a simplified version - in production use a library like newspaper3k or trafilatura.
-    """
-    # Remove script and style elements
-    html_content = re.sub(r'<script[^>]*>.*?</script>', ' ', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<style[^>]*>.*?</style>', ' ', html_content, flags=re.DOTALL)
-    
-    # Remove HTML tags but keep their content
-    text = re.sub(r'<[^>]*>', ' ', html_content)
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+def dedupe_queries(queries: List[str]) -> List[str]:
+    """Remove queries that normalize to the same string, keeping the first occurrence."""
+    seen = set()
+    unique = []
+    for query in queries:
+        normalized = normalize_query(query)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(query)
+    return unique
 
 def sanitize_filename(filename: str) -> str:
     """Convert a string to a valid filename."""
@@ -53,20 +33,41 @@ def sanitize_filename(filename: str) -> str:
     return valid_filename[:100]
 
 def rate_limit(min_time: float = 1.0):
-    """Decorator to rate limit API calls."""
-    last_called = {}
+    """
+    Decorator to rate limit API calls.
+    
+    Thread-safe: each call reserves the next free slot under a lock and then
+    sleeps outside it, so concurrent callers are spaced min_time apart.
+    """
+    next_slot = {}
+    lock = threading.Lock()
     
     def decorator(func):
         def wrapper(*args, **kwargs):
-            now = time.time()
             key = func.__name__
-            if key in last_called:
-                elapsed = now - last_called[key]
-                if elapsed < min_time:
-                    time.sleep(min_time - elapsed)
+            with lock:
+                now = time.time()
+                slot = max(now, next_slot.get(key, now))
+                next_slot[key] = slot + min_time
             
-            result = func(*args, **kwargs)
-            last_called[key] = time.time()
-            return result
+            if slot > now:
+                time.sleep(slot - now)
+            
+            return func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+def page_to_json(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a Scraper.scrape_url result JSON-serializable, dropping the raw HTML."""
+    data = dict(page)
+    data["html"] = ""
+    if isinstance(data.get("published_at"), datetime):
+        data["published_at"] = data["published_at"].isoformat()
+    return data
+
+def page_from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of page_to_json: restore published_at to a datetime."""
+    page = dict(data)
+    if isinstance(page.get("published_at"), str):
+        page["published_at"] = datetime.fromisoformat(page["published_at"])
+    return page
@@ -0,0 +1,176 @@
+# agent/warc.py
+import base64
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config import WARC_DIR, WARC_MAX_FILE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Recorded bodies are already decoded by requests, so these would no longer be true
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _warc_record(warc_type: str, headers: dict, block: bytes) -> bytes:
+    """Serialize one WARC/1.1 record as its own gzip member, so it can be read back from its offset alone."""
+    lines = [
+        "WARC/1.1",
+        f"WARC-Type: {warc_type}",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+    ]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append(f"Content-Length: {len(block)}")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+    return gzip.compress(head + block + b"\r\n\r\n")
+
+
+class WarcArchive:
+    """
+    Rotating, gzip-compressed WARC files of every page fetch, plus a SQLite
+    index (url -> file, offset, length) for random access.
+
+    Each process writes its own files, so workers sharing one directory
+    never interleave records; the index is shared.
+    """
+
+    def __init__(self, directory: str = WARC_DIR, max_file_size: int = WARC_MAX_FILE_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_file_size = max_file_size
+
+        self.lock = threading.Lock()
+        self.file = None
+        self.filename = None
+        self.sequence = 0
+
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    url TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    status INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+        logger.info("WarcArchive initialized at %s", directory)
+
+    def _open_next_file(self):
+        """Start a new WARC file, beginning with a warcinfo record."""
+        if self.file is not None:
+            self.file.close()
+        self.sequence += 1
+        self.filename = (f"crawl-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+                         f"-{os.getpid()}-{self.sequence:05d}.warc.gz")
+        self.file = open(os.path.join(self.directory, self.filename), "ab")
+        info = "software: web-research-agent\r\nformat: WARC File Format 1.1\r\n".encode("utf-8")
+        self.file.write(_warc_record("warcinfo", {"WARC-Filename": self.filename,
+                                                  "Content-Type": "application/warc-fields"}, info))
+
+    def record(self, url: str, response: requests.Response):
+        """
+        Append a fetched response to the current WARC file and index it under url.
+
+        Args:
+            url: URL that was requested (the index key scrape_url looks up on replay)
+            response: The response requests returned, after any redirects
+        """
+        status_line = f"HTTP/1.1 {response.status_code} {response.reason or ''}".rstrip()
+        headers = "".join(f"{name}: {value}\r\n" for name, value in response.headers.items()
+                          if name.lower() not in DROPPED_HEADERS)
+        body = response.content
+        http_block = f"{status_line}\r\n{headers}Content-Length: {len(body)}\r\n\r\n".encode("latin-1", errors="replace") + body
+
+        digest = base64.b32encode(hashlib.sha1(body).digest()).decode("ascii")
+        data = _warc_record("response", {
+            "WARC-Target-URI": response.url or url,
+            "WARC-Payload-Digest": f"sha1:{digest}",
+            "Content-Type": "application/http;msgtype=response",
+        }, http_block)
+
+        try:
+            with self.lock:
+                if self.file is None or self.file.tell() >= self.max_file_size:
+                    self._open_next_file()
+                offset = self.file.tell()
+                self.file.write(data)
+                self.file.flush()
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO records (url, filename, offset, length, status, fetched_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (url, self.filename, offset, len(data), response.status_code, time.time())
+                    )
+        except (OSError, sqlite3.Error) as e:
+            logger.error("Error writing WARC record for %s: %s", url, e)
+
+    def lookup(self, url: str) -> Optional[requests.Response]:
+        """
+        Rebuild the most recently recorded response for a URL.
+
+        Returns:
+            A requests.Response that behaves like the original (status, headers, text), or None if not archived
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT filename, offset, length FROM records WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self._read(url, *row)
+
+    def __iter__(self) -> Iterator[Tuple[str, requests.Response]]:
+        """Yield (url, response) for every archived URL, in file order."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, filename, offset, length FROM records ORDER BY filename, offset"
+            ).fetchall()
+        for url, filename, offset, length in rows:
+            response = self._read(url, filename, offset, length)
+            if response is not None:
+                yield url, response
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def _read(self, url: str, filename: str, offset: int, length: int) -> Optional[requests.Response]:
+        try:
+            with open(os.path.join(self.directory, filename), "rb") as f:
+                f.seek(offset)
+                data = gzip.decompress(f.read(length))
+        except (OSError, EOFError) as e:
+            logger.error("Error reading WARC record for %s from %s: %s", url, filename, e)
+            return None
+
+        # WARC headers, then the HTTP status line and headers, then the body
+        _, _, rest = data.partition(b"\r\n\r\n")
+        http_head, _, body = rest.partition(b"\r\n\r\n")
+        status_line, *header_lines = http_head.decode("latin-1").split("\r\n")
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = int(status_line.split(" ")[1])
+        response.reason = status_line.split(" ", 2)[2] if status_line.count(" ") >= 2 else ""
+        response.headers = CaseInsensitiveDict(
+            line.split(": ", 1) for line in header_lines if ": " in line
+        )
+        # Drop the record's trailing CRLFs
+        response._content = body[:int(response.headers.get("Content-Length", len(body)))]
+        # Same charset logic as a live fetch, so response.text decodes identically
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
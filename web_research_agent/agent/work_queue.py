@@ -0,0 +1,459 @@
+# agent/work_queue.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from config import BROKER_URL, TASK_MAX_ATTEMPTS, TASK_POLL_INTERVAL, TASK_RESULT_TTL
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are leased first, so running research jobs finish before new ones start
+PRIORITY_ANALYZE = 0
+PRIORITY_FETCH = 1
+PRIORITY_RESEARCH = 2
+
+
+class TaskFailedError(Exception):
+    """Raised by wait() when a task ran out of attempts."""
+
+
+class SQLiteWorkQueue:
+    """
+    Leased task queue and per-host politeness table in one SQLite file.
+
+    Every process on the machine (or on a shared volume) that opens the same
+    file sees the same queue. A leased task that is not completed or renewed
+    before its lease expires goes back to pending, so a crashed worker's tasks
+    are picked up by the others.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = TASK_MAX_ATTEMPTS, result_ttl: float = TASK_RESULT_TTL):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        # Autocommit mode so lease() and reserve_host() can take the write lock up front
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (status, priority, id);
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host TEXT PRIMARY KEY,
+                    next_allowed_at REAL NOT NULL
+                );
+            """)
+        logger.info("SQLiteWorkQueue initialized at %s", db_path)
+
+    @contextmanager
+    def _transaction(self):
+        """Serialize against every other process by taking SQLite's write lock immediately."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def submit(self, kind: str, payload: Any, priority: int = PRIORITY_RESEARCH) -> str:
+        """Queue a task and return its id."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO tasks (kind, payload, priority, status, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+                (kind, json.dumps(payload), priority, time.time())
+            )
+        return str(cursor.lastrowid)
+
+    def lease(self, worker_id: str, kinds: List[str], lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Claim the highest-priority pending task of one of the given kinds.
+
+        Returns:
+            Dict with id, kind, payload and attempts, or None if nothing is pending
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM tasks WHERE status = 'pending' "
+                f"AND kind IN ({','.join('?' * len(kinds))}) ORDER BY priority, id LIMIT 1",
+                kinds
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+
+        return {
+            "id": str(row["id"]),
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1
+        }
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float):
+        """Requeue tasks whose worker went away, and drop finished tasks nobody collected."""
+        conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = 'lease expired', worker = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires_at < ?",
+            (self.max_attempts, now, now)
+        )
+        conn.execute(
+            "DELETE FROM tasks WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (now - self.result_ttl,)
+        )
+
+    def extend_lease(self, task_ids: List[str], worker_id: str, lease_seconds: float):
+        """Renew the leases a live worker still holds."""
+        if not task_ids:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE tasks SET lease_expires_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                [(time.time() + lease_seconds, int(task_id), worker_id) for task_id in task_ids]
+            )
+
+    def complete(self, task_id: str, worker_id: str, result: Any):
+        """Store a task's result; ignored if the lease was lost to another worker."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), int(task_id), worker_id)
+            )
+
+    def fail(self, task_id: str, worker_id: str, error: str):
+        """Record a failed attempt; the task is retried until it runs out of attempts."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), int(task_id), worker_id)
+            )
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return status, result and error of a task, or None if it is unknown."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, result, error FROM tasks WHERE id = ?", (int(task_id),)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"]
+        }
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> Any:
+        """
+        Block until a task finishes and return its result.
+
+        Raises:
+            TaskFailedError: if the task failed on its last attempt
+            TimeoutError: if timeout seconds pass first
+        """
+        return _poll_until_done(self, task_id, timeout)
+
+    def reserve_host(self, host: str, min_interval: float) -> float:
+        """
+        Reserve the next request slot for a host across every worker.
+
+        Returns:
+            Seconds the caller must sleep before sending its request
+        """
+        with self._transaction() as conn:
+            now = time.time()
+            row = conn.execute("SELECT next_allowed_at FROM hosts WHERE host = ?", (host,)).fetchone()
+            slot = max(now, row["next_allowed_at"]) if row else now
+            conn.execute(
+                "INSERT OR REPLACE INTO hosts (host, next_allowed_at) VALUES (?, ?)",
+                (host, slot + min_interval)
+            )
+        return slot - now
+
+
+class RedisWorkQueue:
+    """
+    The same queue on Redis, for workers spread across machines.
+
+    Each kind has its own pending sorted set scored by (priority, id); leased
+    task ids sit in a sorted set scored by lease expiry. Every state change
+    (lease, renew, complete, fail, expire) is one Lua script that checks lease
+    ownership and writes in the same step, and lease expiry and host slots
+    use the Redis server clock, so worker clock skew does not matter.
+    """
+
+    PREFIX = "wra:"
+
+    # Shared by the scripts below. Keys are built from ARGV[1], the key prefix.
+    LUA_HELPERS = """
+        local function now()
+            local time = redis.call('TIME')
+            return tonumber(time[1]) + tonumber(time[2]) / 1000000
+        end
+
+        local function holds_lease(key, worker)
+            local task = redis.call('HMGET', key, 'status', 'worker')
+            return task[1] == 'leased' and task[2] == worker
+        end
+
+        local function requeue_or_fail(prefix, task_id, error, max_attempts, result_ttl)
+            local key = prefix .. 'task:' .. task_id
+            local task = redis.call('HMGET', key, 'kind', 'priority', 'attempts')
+            if not task[1] then
+                return
+            end
+            if tonumber(task[3]) >= max_attempts then
+                redis.call('HSET', key, 'status', 'failed', 'error', error, 'worker', '')
+                redis.call('EXPIRE', key, result_ttl)
+            else
+                redis.call('HSET', key, 'status', 'pending', 'error', error, 'worker', '')
+                local score = string.format('%.0f', tonumber(task[2]) * 1e12 + tonumber(task_id))
+                redis.call('ZADD', prefix .. 'pending:' .. task[1], score, task_id)
+            end
+        end
+    """
+
+    # KEYS: pending set of each kind, then the leases set
+    # ARGV: key prefix, worker id, lease seconds
+    LEASE_SCRIPT = LUA_HELPERS + """
+        local best, best_id, best_score
+        for i = 1, #KEYS - 1 do
+            local head = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+            if head[1] and (best_score == nil or tonumber(head[2]) < best_score) then
+                best, best_id, best_score = i, head[1], tonumber(head[2])
+            end
+        end
+        if best_id == nil then
+            return nil
+        end
+        local key = ARGV[1] .. 'task:' .. best_id
+        redis.call('ZREM', KEYS[best], best_id)
+        redis.call('HSET', key, 'status', 'leased', 'worker', ARGV[2])
+        local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+        redis.call('ZADD', KEYS[#KEYS], tostring(now() + tonumber(ARGV[3])), best_id)
+        return {best_id, best, redis.call('HGET', key, 'payload'), attempts}
+    """
+
+    # KEYS: leases set; ARGV: key prefix, max attempts, result ttl
+    EXPIRE_LEASES_SCRIPT = LUA_HELPERS + """
+        local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', tostring(now()))
+        for _, task_id in ipairs(expired) do
+            redis.call('ZREM', KEYS[1], task_id)
+            requeue_or_fail(ARGV[1], task_id, 'lease expired', tonumber(ARGV[2]), tonumber(ARGV[3]))
+        end
+        return #expired
+    """
+
+    # KEYS: leases set; ARGV: key prefix, worker id, lease seconds, task ids...
+    EXTEND_LEASE_SCRIPT = LUA_HELPERS + """
+        local expires = tostring(now() + tonumber(ARGV[3]))
+        for i = 4, #ARGV do
+            if holds_lease(ARGV[1] .. 'task:' .. ARGV[i], ARGV[2]) then
+                redis.call('ZADD', KEYS[1], 'XX', expires, ARGV[i])
+            end
+        end
+    """
+
+    # KEYS: leases set; ARGV: key prefix, worker id, task id, result JSON, result ttl
+    COMPLETE_SCRIPT = LUA_HELPERS + """
+        local key = ARGV[1] .. 'task:' .. ARGV[3]
+        if not holds_lease(key, ARGV[2]) then
+            return 0
+        end
+        redis.call('ZREM', KEYS[1], ARGV[3])
+        redis.call('HSET', key, 'status', 'done', 'result', ARGV[4])
+        redis.call('EXPIRE', key, ARGV[5])
+        return 1
+    """
+
+    # KEYS: leases set; ARGV: key prefix, worker id, task id, error, max attempts, result ttl
+    FAIL_SCRIPT = LUA_HELPERS + """
+        if not holds_lease(ARGV[1] .. 'task:' .. ARGV[3], ARGV[2]) then
+            return 0
+        end
+        redis.call('ZREM', KEYS[1], ARGV[3])
+        requeue_or_fail(ARGV[1], ARGV[3], ARGV[4], tonumber(ARGV[5]), tonumber(ARGV[6]))
+        return 1
+    """
+
+    RESERVE_HOST_SCRIPT = LUA_HELPERS + """
+        local current = now()
+        local slot = math.max(current, tonumber(redis.call('GET', KEYS[1]) or '0'))
+        local interval = tonumber(ARGV[1])
+        redis.call('SET', KEYS[1], tostring(slot + interval), 'EX', math.ceil(interval) + 60)
+        return tostring(slot - current)
+    """
+
+    def __init__(self, client, max_attempts: int = TASK_MAX_ATTEMPTS, result_ttl: float = TASK_RESULT_TTL):
+        self.client = client
+        self.max_attempts = max_attempts
+        self.result_ttl = int(result_ttl)
+        self.lease_script = client.register_script(self.LEASE_SCRIPT)
+        self.expire_leases_script = client.register_script(self.EXPIRE_LEASES_SCRIPT)
+        self.extend_lease_script = client.register_script(self.EXTEND_LEASE_SCRIPT)
+        self.complete_script = client.register_script(self.COMPLETE_SCRIPT)
+        self.fail_script = client.register_script(self.FAIL_SCRIPT)
+        self.reserve_host_script = client.register_script(self.RESERVE_HOST_SCRIPT)
+        logger.info("RedisWorkQueue initialized")
+
+    def _task_key(self, task_id: str) -> str:
+        return f"{self.PREFIX}task:{task_id}"
+
+    def _pending_key(self, kind: str) -> str:
+        return f"{self.PREFIX}pending:{kind}"
+
+    @property
+    def _leases_key(self) -> str:
+        return f"{self.PREFIX}leases"
+
+    @staticmethod
+    def _score(priority: int, task_id: str) -> float:
+        # Exact in a double for up to 10**12 tasks
+        return priority * 10 ** 12 + int(task_id)
+
+    def submit(self, kind: str, payload: Any, priority: int = PRIORITY_RESEARCH) -> str:
+        """Queue a task and return its id."""
+        task_id = str(self.client.incr(f"{self.PREFIX}seq"))
+        pipe = self.client.pipeline()
+        pipe.hset(self._task_key(task_id), mapping={
+            "kind": kind, "payload": json.dumps(payload), "priority": priority,
+            "status": "pending", "attempts": 0
+        })
+        pipe.zadd(self._pending_key(kind), {task_id: self._score(priority, task_id)})
+        pipe.execute()
+        return task_id
+
+    def lease(self, worker_id: str, kinds: List[str], lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Claim the highest-priority pending task of one of the given kinds.
+
+        Returns:
+            Dict with id, kind, payload and attempts, or None if nothing is pending
+        """
+        self._expire_leases()
+        if not kinds:
+            return None
+
+        keys = [self._pending_key(kind) for kind in kinds] + [self._leases_key]
+        leased = self.lease_script(keys=keys, args=[self.PREFIX, worker_id, lease_seconds])
+        if leased is None:
+            return None
+
+        task_id, kind_index, payload, attempts = leased
+        task_id = task_id.decode() if isinstance(task_id, bytes) else task_id
+        return {"id": task_id, "kind": kinds[int(kind_index) - 1], "payload": json.loads(payload),
+                "attempts": int(attempts)}
+
+    def _expire_leases(self):
+        """Requeue tasks whose worker went away."""
+        self.expire_leases_script(keys=[self._leases_key], args=[self.PREFIX, self.max_attempts, self.result_ttl])
+
+    def extend_lease(self, task_ids: List[str], worker_id: str, lease_seconds: float):
+        """Renew the leases a live worker still holds."""
+        if task_ids:
+            self.extend_lease_script(keys=[self._leases_key], args=[self.PREFIX, worker_id, lease_seconds, *task_ids])
+
+    def complete(self, task_id: str, worker_id: str, result: Any):
+        """Store a task's result; ignored if the lease was lost to another worker."""
+        self.complete_script(keys=[self._leases_key],
+                             args=[self.PREFIX, worker_id, task_id, json.dumps(result), self.result_ttl])
+
+    def fail(self, task_id: str, worker_id: str, error: str):
+        """Record a failed attempt; the task is retried until it runs out of attempts."""
+        self.fail_script(keys=[self._leases_key],
+                         args=[self.PREFIX, worker_id, task_id, error, self.max_attempts, self.result_ttl])
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return status, result and error of a task, or None if it is unknown."""
+        status, result, error = self.client.hmget(self._task_key(task_id), "status", "result", "error")
+        if status is None:
+            return None
+        decode = lambda v: v.decode() if isinstance(v, bytes) else v
+        return {
+            "status": decode(status),
+            "result": json.loads(result) if result is not None else None,
+            "error": decode(error)
+        }
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> Any:
+        """
+        Block until a task finishes and return its result.
+
+        Raises:
+            TaskFailedError: if the task failed on its last attempt
+            TimeoutError: if timeout seconds pass first
+        """
+        return _poll_until_done(self, task_id, timeout)
+
+    def reserve_host(self, host: str, min_interval: float) -> float:
+        """
+        Reserve the next request slot for a host across every worker.
+
+        Returns:
+            Seconds the caller must sleep before sending its request
+        """
+        return float(self.reserve_host_script(keys=[f"{self.PREFIX}host:{host}"], args=[min_interval]))
+
+
+def _poll_until_done(queue, task_id: str, timeout: Optional[float]) -> Any:
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        state = queue.status(task_id)
+        if state is None:
+            raise TaskFailedError(f"Task {task_id} is unknown or expired")
+        if state["status"] == "done":
+            return state["result"]
+        if state["status"] == "failed":
+            raise TaskFailedError(f"Task {task_id} failed: {state['error']}")
+        if deadline is not None and time.time() >= deadline:
+            raise TimeoutError(f"Task {task_id} did not finish within {timeout} seconds")
+        time.sleep(TASK_POLL_INTERVAL)
+
+
+def open_work_queue(broker_url: str = BROKER_URL):
+    """
+    Open the work queue named by a broker URL.
+
+    Args:
+        broker_url: sqlite:///path/to/queue.db, or redis://host:port/db (needs the redis package)
+
+    Returns:
+        SQLiteWorkQueue or RedisWorkQueue
+    """
+    if broker_url.startswith(("redis://", "rediss://")):
+        import redis
+        return RedisWorkQueue(redis.Redis.from_url(broker_url))
+    if broker_url.startswith("sqlite:///"):
+        return SQLiteWorkQueue(broker_url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported broker URL: {broker_url}")
@@ -0,0 +1,120 @@
+# agent/worker.py
+import logging
+import os
+import socket
+import threading
+from typing import Any, Dict, Optional
+from agent.utils import page_to_json, page_from_json
+from config import WORKER_THREADS, TASK_LEASE_SECONDS, TASK_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Sub-tasks that running research jobs wait on
+SUBTASK_KINDS = ["analyze", "fetch"]
+
+
+class Worker:
+    """
+    Runs research, fetch and analyze tasks from a shared work queue.
+
+    Any number of workers, on any number of machines, can serve the same
+    queue. Leases of running tasks are renewed by a heartbeat thread, so a
+    worker that dies has its tasks handed to the others.
+    """
+
+    def __init__(self, agent: Any, queue: Any, threads: int = WORKER_THREADS, worker_id: Optional[str] = None):
+        """
+        Args:
+            agent: WebResearchAgent whose fetch/analyze/run_research do the work
+            queue: SQLiteWorkQueue or RedisWorkQueue
+            threads: Tasks run at once (at least 2)
+            worker_id: Name recorded on leased tasks, defaults to host-pid
+        """
+        self.agent = agent
+        self.queue = queue
+        self.threads = max(2, threads)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lock = threading.Lock()
+        self.running = {}  # task id -> kind
+        self.stop_event = threading.Event()
+        self.handlers = {
+            "research": self._run_research,
+            "fetch": self._run_fetch,
+            "analyze": self._run_analyze
+        }
+
+    def run(self):
+        """Serve the queue until stop() is called or the process is interrupted."""
+        logger.info("Worker %s started with %s threads", self.worker_id, self.threads)
+        threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(self.threads)]
+        threads.append(threading.Thread(target=self._heartbeat, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self.stop_event.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Worker %s stopping", self.worker_id)
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                task = self._lease()
+            except Exception as e:
+                logger.error("Error leasing task: %s", e)
+                task = None
+
+            if task is None:
+                self.stop_event.wait(TASK_POLL_INTERVAL)
+                continue
+            self._execute(task)
+
+    def _lease(self) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            # A research job blocks its thread until its sub-tasks are done, so
+            # keep one thread free for those; otherwise every worker could end up
+            # holding research jobs that nobody is left to serve
+            research_running = sum(1 for kind in self.running.values() if kind == "research")
+            kinds = SUBTASK_KINDS + (["research"] if research_running < self.threads - 1 else [])
+
+            task = self.queue.lease(self.worker_id, kinds, TASK_LEASE_SECONDS)
+            if task is not None:
+                self.running[task["id"]] = task["kind"]
+        return task
+
+    def _execute(self, task: Dict[str, Any]):
+        try:
+            result = self.handlers[task["kind"]](task["payload"])
+            self.queue.complete(task["id"], self.worker_id, result)
+        except Exception as e:
+            logger.error("Task %s (%s, attempt %s) failed: %s", task['id'], task['kind'], task['attempts'], e)
+            self.queue.fail(task["id"], self.worker_id, str(e))
+        finally:
+            with self.lock:
+                self.running.pop(task["id"], None)
+
+    def _heartbeat(self):
+        while not self.stop_event.wait(TASK_LEASE_SECONDS / 3):
+            with self.lock:
+                task_ids = list(self.running)
+            try:
+                self.queue.extend_lease(task_ids, self.worker_id, TASK_LEASE_SECONDS)
+            except Exception as e:
+                logger.error("Error renewing leases: %s", e)
+
+    def _run_research(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.agent.run_research(payload["query"], deep=payload.get("deep", False))
+        result["worker"] = self.worker_id
+        return result
+
+    def _run_fetch(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        page = self.agent.fetch(payload)
+        return page_to_json(page) if page is not None else None
+
+    def _run_analyze(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.agent.analyze(payload["query"], page_from_json(payload["content"]))
@@ -0,0 +1,199 @@
+# benchmarks/bench_logging.py
+"""
+Logging overhead in the concurrent scrape/analyze pipeline.
+
+Runs ScrapeScheduler over synthetic pages whose fetch and analyze steps do
+the real text extraction and log what the real stages log, under three
+configurations:
+
+    off     logging disabled (baseline)
+    legacy  basicConfig with a synchronous FileHandler and StreamHandler, eager f-strings
+    queued  agent.logging_setup: QueueListener writer, lazy formatting, sampling, rotation
+
+A second table isolates the logging calls themselves: every thread emits
+the per-page INFO line as fast as it can, so it shows the cost each caller
+pays, with and without sampling.
+
+Console output goes to /dev/null and log files to a temporary directory.
+
+Usage:
+    python benchmarks/bench_logging.py [--pages N] [--threads N] [--repeat N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.logging_setup import setup_logging, stop_logging
+from config import LOG_SAMPLE_EVERY
+from agent.scheduler import ScrapeScheduler
+from agent.text import clean_text, extract_main_content
+
+scraper_logger = logging.getLogger("agent.scraper")
+analyzer_logger = logging.getLogger("agent.analyzer")
+
+PAGE_HTML = "<html><head><title>t</title><script>var x = 1;</script></head><body>" + (
+    "<p>Quantum error correction experiments reached new thresholds this year.</p>" * 50
+) + "</body></html>"
+
+
+def legacy_fetch(url_data):
+    url = url_data["url"]
+    scraper_logger.info(f"Scraping URL: {url}")
+    content = clean_text(extract_main_content(PAGE_HTML))
+    scraper_logger.info(f"Successfully scraped {url}, content length: {len(content)}")
+    return {"url": url, "success": True, "content": content}
+
+
+def legacy_analyze(content):
+    analyzer_logger.info(f"Analyzing content from: {content['url']}")
+    analysis = {"url": content["url"], "relevance_score": 0.0, "key_insights": content["content"].split(". ")}
+    analyzer_logger.info(f"Completed analysis for {content['url']} - Relevance: {analysis['relevance_score']:.2f}")
+    return analysis
+
+
+def lazy_fetch(url_data):
+    url = url_data["url"]
+    scraper_logger.debug("Scraping URL: %s", url)
+    content = clean_text(extract_main_content(PAGE_HTML))
+    scraper_logger.info("Successfully scraped %s, content length: %s", url, len(content))
+    return {"url": url, "success": True, "content": content}
+
+
+def lazy_analyze(content):
+    analyzer_logger.debug("Analyzing content from: %s", content["url"])
+    analysis = {"url": content["url"], "relevance_score": 0.0, "key_insights": content["content"].split(". ")}
+    analyzer_logger.info("Completed analysis for %s - Relevance: %.2f", content["url"], analysis["relevance_score"])
+    return analysis
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_pipeline(pages: int, threads: int, fetch_fn, analyze_fn) -> float:
+    candidates = [{"url": f"https://site{i}.example/page", "initial_relevance": 0.5} for i in range(pages)]
+    scheduler = ScrapeScheduler(fetch_fn, analyze_fn, max_pages=pages, max_in_flight=threads,
+                                min_relevant=pages + 1)
+    start = time.perf_counter()
+    scheduler.run(candidates)
+    return time.perf_counter() - start
+
+
+def run_calls(calls: int, threads: int, lazy: bool) -> float:
+    """Seconds for threads to emit calls per-page INFO records between them."""
+    def emit():
+        for i in range(calls // threads):
+            url = f"https://site{i}.example/page"
+            if lazy:
+                scraper_logger.info("Successfully scraped %s, content length: %s", url, 3750)
+            else:
+                scraper_logger.info(f"Successfully scraped {url}, content length: {3750}")
+
+    workers = [threading.Thread(target=emit) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def bench_mode(mode: str, log_dir: str, run):
+    """
+    Run run(lazy) under one logging configuration.
+
+    Returns:
+        (seconds run took, seconds to drain the log queue afterwards)
+    """
+    reset_root()
+    log_file = os.path.join(log_dir, f"{mode}.log")
+    devnull = open(os.devnull, "w")
+    real_stderr, sys.stderr = sys.stderr, devnull
+    try:
+        if mode == "off":
+            logging.getLogger().setLevel(logging.CRITICAL)
+            return run(True), 0.0
+
+        if mode == "legacy":
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                handlers=[logging.FileHandler(log_file), logging.StreamHandler()],
+                force=True
+            )
+            return run(False), 0.0
+
+        sample_every = None if mode == "queued-all" else LOG_SAMPLE_EVERY
+        setup_logging(level="INFO", log_file=log_file, sample_every=sample_every or {})
+        elapsed = run(True)
+        drain_start = time.perf_counter()
+        stop_logging()
+        return elapsed, time.perf_counter() - drain_start
+    finally:
+        reset_root()
+        sys.stderr = real_stderr
+        devnull.close()
+
+
+def bench(modes, repeat: int, run):
+    """Best (seconds, drain seconds, log lines per run) of each mode, with the modes interleaved."""
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Interleave the modes so drift in machine load hits them all alike
+        runs = {mode: [] for mode in modes}
+        for _ in range(repeat):
+            for mode in modes:
+                runs[mode].append(bench_mode(mode, log_dir, run))
+
+        results = {}
+        for mode in modes:
+            lines = 0
+            # Includes rotated files (mode.log.1, ...)
+            for name in os.listdir(log_dir):
+                if name.startswith(f"{mode}.log"):
+                    with open(os.path.join(log_dir, name), encoding="utf-8") as f:
+                        lines += sum(1 for _ in f)
+            lines //= repeat
+            results[mode] = min(runs[mode]) + (lines,)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead in the scrape/analyze pipeline")
+    parser.add_argument("--pages", type=int, default=300, help="Pages pushed through the pipeline per run")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent fetch/analyze workers")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode (best is reported)")
+    parser.add_argument("--calls", type=int, default=50000, help="Records emitted in the logging-call benchmark")
+    args = parser.parse_args()
+
+    pipeline = bench(("off", "legacy", "queued"), args.repeat, lambda lazy: run_pipeline(
+        args.pages, args.threads, lazy_fetch if lazy else legacy_fetch, lazy_analyze if lazy else legacy_analyze))
+
+    baseline = pipeline["off"][0]
+    print(f"Pipeline: {args.pages} pages, {args.threads} threads")
+    print(f"{'mode':<11} {'pipeline':>10} {'per page':>10} {'overhead':>10} {'drain':>9} {'lines':>7}")
+    for mode, (elapsed, drain, lines) in pipeline.items():
+        overhead = (elapsed - baseline) / args.pages * 1e6
+        print(f"{mode:<11} {elapsed * 1000:>8.1f}ms {elapsed / args.pages * 1e6:>8.1f}us "
+              f"{overhead:>8.1f}us {drain * 1000:>7.1f}ms {lines:>7}")
+
+    calls = bench(("legacy", "queued-all", "queued"), args.repeat,
+                  lambda lazy: run_calls(args.calls, args.threads, lazy))
+    print()
+    print(f"Logging calls: {args.calls} INFO records from {args.threads} threads")
+    print(f"{'mode':<11} {'callers':>10} {'per call':>10} {'drain':>9} {'lines':>7}")
+    for mode, (elapsed, drain, lines) in calls.items():
+        print(f"{mode:<11} {elapsed * 1000:>8.1f}ms {elapsed / args.calls * 1e6:>8.2f}us "
+              f"{drain * 1000:>7.1f}ms {lines:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_text.py
+"""
+Microbenchmarks for agent.text over the pages in debug_output/.
+
+Pages can also be read from a WARC archive recorded with `main.py --record`.
+Both versions are timed on every page; tests/test_text.py checks that their
+output is byte-identical.
+
+Usage:
+    python benchmarks/bench_text.py [--repeat N] [--warc DIR]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.text import clean_text, extract_main_content
+from agent.warc import WarcArchive
+
+DEBUG_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "debug_output")
+
+
+def legacy_clean_text(text: str) -> str:
+    """clean_text as it was in agent/utils.py before agent.text existed."""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'[^\w\s.,;:?!\'\"()-]', ' ', text)
+    return text
+
+
+def legacy_extract_main_content(html_content: str) -> str:
+    """extract_main_content as it was in agent/utils.py before agent.text existed."""
+    html_content = re.sub(r'<script[^>]*>.*?</script>', ' ', html_content, flags=re.DOTALL)
+    html_content = re.sub(r'<style[^>]*>.*?</style>', ' ', html_content, flags=re.DOTALL)
+    text = re.sub(r'<[^>]*>', ' ', html_content)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def load_pages(warc_dir: str = None):
+    # Unclosed <script> tags make the DOTALL .*? pattern rescan to the end of the page each time
+    pages = {"synthetic: 5000 unclosed <script>": "<script>var a = 1;" * 5000}
+    if warc_dir:
+        for url, response in WarcArchive(warc_dir):
+            if response.ok and "html" in response.headers.get("Content-Type", ""):
+                pages[url] = response.text
+        return pages
+
+    for name in sorted(os.listdir(DEBUG_OUTPUT_DIR)):
+        with open(os.path.join(DEBUG_OUTPUT_DIR, name), encoding="utf-8", errors="replace") as f:
+            pages[name] = f.read()
+    return pages
+
+
+def bench(label: str, func, arg, repeat: int) -> float:
+    seconds = min(timeit.repeat(lambda: func(arg), number=1, repeat=repeat))
+    return seconds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent.text against the original regex implementation")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per page (best is reported)")
+    parser.add_argument("--warc", metavar="DIR", help="Use the pages in this WARC archive instead of debug_output/")
+    args = parser.parse_args()
+
+    pages = load_pages(args.warc)
+
+    print(f"{'page':<40} {'KiB':>6} {'extract old':>12} {'extract new':>12} {'clean old':>10} {'clean new':>10}")
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for name, html in pages.items():
+        extracted = legacy_extract_main_content(html)
+        timings = [
+            bench("extract old", legacy_extract_main_content, html, args.repeat),
+            bench("extract new", extract_main_content, html, args.repeat),
+            bench("clean old", legacy_clean_text, extracted, args.repeat),
+            bench("clean new", clean_text, extracted, args.repeat),
+        ]
+        totals = [t + x for t, x in zip(totals, timings)]
+        print(f"{name:<40} {len(html) // 1024:>6} " + " ".join(f"{t:>10.2f}ms" if i < 2 else f"{t:>8.2f}ms"
+                                                          for i, t in enumerate(timings)))
+
+    print(f"{'total':<40} {'':>6} " + " ".join(f"{t:>10.2f}ms" if i < 2 else f"{t:>8.2f}ms"
+                                              for i, t in enumerate(totals)))
+
+
+if __name__ == "__main__":
+    main()
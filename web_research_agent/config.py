@@ -19,8 +19,77 @@ GEMINI_API_KEY = "api_key_her"
 
 # Search Settings
 MAX_SEARCH_RESULTS = 5
-MAX_PAGES_TO_SCRAPE = 2
+SERPER_MAX_RESULTS = 100  # most results Serper returns for one search
+MAX_PAGES_TO_SCRAPE = 10  # hard cap; scraping usually stops earlier
+MAX_CONCURRENT_FETCHES = 4
+MIN_RELEVANT_SOURCES = 3  # stop scraping once this many sources clear RELEVANCE_THRESHOLD
+RELEVANCE_THRESHOLD = 0.4
 
-# Agent Settings
+# LLM Dispatch Settings (match these to the Gemini quota tier of the API key)
+LLM_INITIAL_CONCURRENCY = 2
+LLM_MAX_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 60
+LLM_TOKENS_PER_MINUTE = 1000000
+LLM_OUTPUT_TOKEN_ESTIMATE = 1024  # tokens budgeted for each response
+LLM_MAX_RETRIES = 5  # retries after a 429 / RESOURCE_EXHAUSTED before giving up
+
+# Deep Research Settings (--deep: more sources, no early stop, so large runs reach map-reduce synthesis)
+DEEP_SEARCH_TERMS = 5
+DEEP_MAX_SEARCH_RESULTS = 10
+DEEP_MAX_PAGES_TO_SCRAPE = 40
+
+# Synthesis Settings
+HIERARCHICAL_SYNTHESIS_MIN_SOURCES = 10  # up to this many relevant sources go into one prompt; above it, map-reduce
+SYNTHESIS_GROUP_SIZE = 8  # max sources per topic group in the map step
+SYNTHESIS_MAX_WORKERS = 4  # parallel map calls
+
+# Freshness Settings
+DATE_SCAN_CHARS = 5000  # characters of page text searched for a date when no structured date exists
+FRESHNESS_HALF_LIFE_DAYS = 365  # age at which a page's freshness score drops to 0.5
+
+# Domain Reputation Settings
+DOMAIN_STATS_HALF_LIFE = 7 * 24 * 60 * 60  # seconds for a domain's history to lose half its weight
+DOMAIN_SKIP_MIN_ATTEMPTS = 3  # recent (decayed) attempts needed before a domain can be skipped
+DOMAIN_SKIP_SUCCESS_RATE = 0.25  # skip domains whose recent success rate falls below this
+SLOW_DOMAIN_LATENCY = 8.0  # seconds; p90 fetch latency above this lowers a domain's priority
+THIN_CONTENT_CHARS = 500  # a fetch that extracts less text than this (paywall, consent or login wall) counts as failed
+ROBOTS_CACHE_TTL = 24 * 60 * 60  # seconds
+SEARCH_CACHE_TTL = 24 * 60 * 60  # seconds
+NEWS_CACHE_TTL = 60 * 60  # seconds, news goes stale faster
+PAGE_CACHE_TTL = 24 * 60 * 60  # seconds a fetched page is reused instead of refetched
+ANALYSIS_CACHE_TTL = 7 * 24 * 60 * 60  # seconds a page's Gemini analysis is reused for the same query
+
+# Storage Settings
+DATA_DIR = "data"
+CORPUS_DB_PATH = os.path.join(DATA_DIR, "corpus.db")
+CACHE_DB_PATH = os.path.join(DATA_DIR, "cache.db")
+DOMAIN_STATS_DB_PATH = os.path.join(DATA_DIR, "domain_stats.db")
+WARC_DIR = os.path.join(DATA_DIR, "warc")  # --record writes fetches here, --replay serves them back
+WARC_MAX_FILE_SIZE = 1024 * 1024 * 1024  # bytes; a new .warc.gz file is started past this size
+
+# Distributed Settings
+# sqlite:///path shares a queue between processes on one machine; redis://host:port/db
+# spreads workers across machines and shares the robots, page and analysis caches too
+BROKER_URL = "sqlite:///" + os.path.join(DATA_DIR, "queue.db")
+WORKER_THREADS = 4  # tasks each worker process runs at once; at least one is kept for fetch/analyze
+TASK_LEASE_SECONDS = 120  # a task whose worker stops renewing its lease this long goes to another worker
+TASK_MAX_ATTEMPTS = 3
+TASK_POLL_INTERVAL = 0.5  # seconds between status checks while waiting on a task
+TASK_TIMEOUT = 30 * 60  # seconds a coordinator waits for one task
+SUBMIT_TIMEOUT = 4 * 60 * 60  # seconds --submit/--batch waits for all of its research jobs
+TASK_RESULT_TTL = 24 * 60 * 60  # seconds finished tasks are kept for their submitter
+HOST_MIN_INTERVAL = 2.0  # seconds between requests to one host, across all workers
+
+# Logging Settings
 LOG_LEVEL = "INFO"
+LOG_FILE = "web_research_agent.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate the log file past this size
+LOG_BACKUP_COUNT = 5
+# Per-page stages log once or more per URL; keep 1 in N of their INFO records (DEBUG and warnings always kept)
+LOG_SAMPLE_EVERY = {
+    "agent.scraper": 5,
+    "agent.analyzer": 5,
+}
+
+# Agent Settings
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -3,25 +3,32 @@ import os
 import logging
 import argparse
 import time
-from typing import Dict, List, Any
+import hashlib
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-from config import MAX_SEARCH_RESULTS, MAX_PAGES_TO_SCRAPE
+from config import (
+    MAX_SEARCH_RESULTS, MAX_PAGES_TO_SCRAPE, DEEP_SEARCH_TERMS, DEEP_MAX_SEARCH_RESULTS, DEEP_MAX_PAGES_TO_SCRAPE,
+    PAGE_CACHE_TTL, ANALYSIS_CACHE_TTL, TASK_TIMEOUT, SUBMIT_TIMEOUT,
+    BROKER_URL, WORKER_THREADS
+)
 from agent.query_analyzer import QueryAnalyzer
-from agent.search_tool import SearchTool
+from agent.search_tool import SearchTool, OfflineSearchTool
 from agent.scraper import Scraper
+from agent.corpus import Corpus
+from agent.cache import TTLCache, open_cache
+from agent.domain_stats import DomainStats
+from agent.warc import WarcArchive
 from agent.analyzer import ContentAnalyzer
 from agent.synthesizer import Synthesizer
+from agent.scheduler import ScrapeScheduler
+from agent.utils import dedupe_queries, page_to_json, page_from_json
+from agent.work_queue import open_work_queue, TaskFailedError, PRIORITY_FETCH, PRIORITY_ANALYZE, PRIORITY_RESEARCH
+from agent.worker import Worker
+from agent.structured_output import METRICS as STRUCTURED_OUTPUT_METRICS
+from agent.llm import get_dispatcher
+from agent.logging_setup import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("web_research_agent.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class WebResearchAgent:
@@ -30,25 +37,103 @@ class WebResearchAgent:
     from the web based on user queries.
     """
     
-    def __init__(self):
+    def __init__(self, offline: bool = False, broker_url: Optional[str] = None, record: bool = False, replay: bool = False):
+        """
+        Args:
+            offline: Answer from the local corpus instead of the web
+            broker_url: Work queue to fan fetch and analyze steps out to workers; run them in-process if None
+            record: Write every page fetch to the WARC archive
+            replay: Serve page fetches from the WARC archive instead of the network
+        """
         logger.info("Initializing Web Research Agent")
+        self.offline = offline
+        self.queue = open_work_queue(broker_url) if broker_url else None
+        self.corpus = Corpus()
+        # With a Redis broker the robots, search, page and analysis caches are shared by every worker
+        self.cache = open_cache(broker_url) if broker_url else TTLCache()
+        self.domain_stats = DomainStats()
         self.query_analyzer = QueryAnalyzer()
-        self.search_tool = SearchTool()
-        self.scraper = Scraper()
+        self.search_tool = OfflineSearchTool(self.corpus) if offline else SearchTool(cache=self.cache)
+        self.record = record
+        self.replay = replay
+        self.scraper = Scraper(
+            cache=self.cache,
+            domain_stats=self.domain_stats,
+            politeness=self.queue,
+            archive=WarcArchive() if record or replay else None,
+            replay=replay
+        )
         self.content_analyzer = ContentAnalyzer()
         self.synthesizer = Synthesizer()
     
-    def run_research(self, query: str) -> Dict[str, Any]:
+    def fetch(self, url_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fetch one search result, from the corpus when offline, and merge in its search metadata."""
+        if self.offline:
+            scraped_data = self.corpus.get_page(url_data["url"])
+            if scraped_data is None:
+                return None
+        else:
+            # Replays exist to re-run extraction and recordings must capture every page,
+            # so neither is short-cut by the page cache
+            cached = None if self.replay or self.record else self.cache.get("pages", url_data["url"])
+            if cached is not None:
+                scraped_data = page_from_json(cached)
+            else:
+                scraped_data = self.scraper.scrape_url(url_data["url"])
+                # Keep the cleaned text so later runs can answer from the corpus; archived
+                # pages are old and may come from a different extractor, so replays leave both alone
+                if not self.replay:
+                    self.corpus.add_page(scraped_data)
+                    if scraped_data["success"]:
+                        self.cache.set("pages", url_data["url"], page_to_json(scraped_data), PAGE_CACHE_TTL)
+        
+        # Merge the url_data metadata with scraped data
+        scraped_data.update({
+            "snippet": url_data.get("snippet", ""),
+            "initial_relevance": url_data.get("initial_relevance", 0)
+        })
+        return scraped_data
+    
+    def analyze(self, query: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze one scraped page and feed Gemini's reliability verdict back into the domain table."""
+        # Reuse an earlier analysis of the same page text for the same query
+        cache_key = hashlib.sha1(f"{query}\n{content['url']}\n{content.get('content', '')}".encode("utf-8")).hexdigest()
+        cached = self.cache.get("analysis", cache_key)
+        if cached is not None:
+            return cached
+        
+        analysis = self.content_analyzer.analyze_content(query, content)
+        # An empty summary means the Gemini call failed and the scores are just defaults
+        if analysis.get("summary"):
+            if not self.offline and not self.replay:
+                self.domain_stats.record_reliability(content["url"], analysis.get("reliability_score", 0.0))
+            self.cache.set("analysis", cache_key, analysis, ANALYSIS_CACHE_TTL)
+        return analysis
+    
+    def _remote_fetch(self, url_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run fetch() on whichever worker leases the task."""
+        task_id = self.queue.submit("fetch", url_data, PRIORITY_FETCH)
+        page = self.queue.wait(task_id, timeout=TASK_TIMEOUT)
+        return page_from_json(page) if page is not None else None
+    
+    def _remote_analyze(self, query: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        """Run analyze() on whichever worker leases the task."""
+        task_id = self.queue.submit("analyze", {"query": query, "content": page_to_json(content)}, PRIORITY_ANALYZE)
+        return self.queue.wait(task_id, timeout=TASK_TIMEOUT)
+    
+    def run_research(self, query: str, deep: bool = False) -> Dict[str, Any]:
         """
         Execute the full research pipeline on a user query.
         
         Args:
             query: The research query from the user
+            deep: Search more terms and results, and scrape up to DEEP_MAX_PAGES_TO_SCRAPE pages
+                without stopping early, for a report over many sources
             
         Returns:
             Dict with research report and metadata
         """
-        logger.info(f"Starting research for query: {query}")
+        logger.info("Starting research for query: %s", query)
         start_time = time.time()
         
         # Step 1: Analyze the query
@@ -57,20 +142,18 @@ class WebResearchAgent:
         
         # Step 2: Perform web searches
         logger.info("Step 2: Performing web searches")
-        search_results = []
         
-        # Use the first 3 search terms from query analysis
-        search_terms = query_analysis["search_terms"][:3]
+        # Use the first 3 distinct search terms from query analysis (more for a deep run)
+        search_terms = dedupe_queries(query_analysis["search_terms"])[:DEEP_SEARCH_TERMS if deep else 3]
         
-        for term in search_terms:
-            # Regular search
-            results = self.search_tool.search(term)
-            search_results.append(results)
-            
-            # If time-sensitive or news-related, also do news search
-            if query_analysis["time_sensitivity"] in ["high", "medium"] or query_analysis["query_type"] == "news":
-                news_results = self.search_tool.search_news(term)
-                search_results.append(news_results)
+        # If time-sensitive or news-related, also do news search
+        include_news = query_analysis["time_sensitivity"] in ["high", "medium"] or query_analysis["query_type"] == "news"
+        
+        # All terms go out in one batched request; repeats are served from the search cache
+        search_results = self.search_tool.search_batch(
+            search_terms, include_news=include_news,
+            num_results=DEEP_MAX_SEARCH_RESULTS if deep else MAX_SEARCH_RESULTS
+        )
 
         # main.py (continued)
         # Step 3: Extract and deduplicate URLs
@@ -88,7 +171,7 @@ class WebResearchAgent:
                 seen_urls.add(url_data["url"])
                 unique_urls.append(url_data)
         
-        logger.info(f"Found {len(unique_urls)} unique URLs to process")
+        logger.info("Found %s unique URLs to process", len(unique_urls))
         
         # Sort URLs by relevance (if snippets contain query terms)
         query_terms = set(term.lower() for term in query.split())
@@ -99,34 +182,33 @@ class WebResearchAgent:
             term_matches = sum(1 for term in query_terms if term in snippet or term in title)
             url_data["initial_relevance"] = term_matches / max(1, len(query_terms))
         
-        # Sort by initial relevance
-        unique_urls.sort(key=lambda x: x.get("initial_relevance", 0), reverse=True)
+        # Drop domains that have recently kept failing, unless everything would be dropped
+        if not self.offline:
+            usable_urls = [u for u in unique_urls if not self.domain_stats.should_skip(u["url"])]
+            if usable_urls and len(usable_urls) < len(unique_urls):
+                logger.info("Skipping %s URLs from chronically failing domains", len(unique_urls) - len(usable_urls))
+                unique_urls = usable_urls
         
-        # Limit to max pages to scrape
-        urls_to_scrape = unique_urls[:MAX_PAGES_TO_SCRAPE]
+        # Sort by initial relevance, adjusted by each domain's track record
+        for url_data in unique_urls:
+            url_data["domain_score"] = 0.0 if self.offline else self.domain_stats.score(url_data["url"])
+        unique_urls.sort(key=lambda x: x.get("initial_relevance", 0) + x["domain_score"], reverse=True)
         
-        # Step 4: Scrape content from URLs
-        logger.info(f"Step 4: Scraping content from {len(urls_to_scrape)} URLs")
-        scraped_contents = []
-        for url_data in urls_to_scrape:
-            try:
-                scraped_data = self.scraper.scrape_url(url_data["url"])
-                # Merge the url_data metadata with scraped data
-                scraped_data.update({
-                    "snippet": url_data.get("snippet", ""),
-                    "initial_relevance": url_data.get("initial_relevance", 0)
-                })
-                scraped_contents.append(scraped_data)
-            except Exception as e:
-                logger.error(f"Error scraping {url_data['url']}: {str(e)}")
-        
-        # Step 5: Analyze scraped content
-        logger.info("Step 5: Analyzing scraped content")
-        analyzed_contents = []
-        for content in scraped_contents:
-            if content.get("success") and content.get("content"):
-                analysis = self.content_analyzer.analyze_content(query, content)
-                analyzed_contents.append(analysis)
+        # Step 4 & 5: Scrape and analyze content, most promising URLs first, until enough relevant sources are found
+        max_pages = DEEP_MAX_PAGES_TO_SCRAPE if deep else MAX_PAGES_TO_SCRAPE
+        logger.info("Step 4: Scraping and analyzing up to %s URLs", min(len(unique_urls), max_pages))
+        if self.queue is None:
+            fetch_fn, analyze_fn = self.fetch, lambda content: self.analyze(query, content)
+        else:
+            # Each page is fetched and analyzed by whichever worker is free
+            fetch_fn, analyze_fn = self._remote_fetch, lambda content: self._remote_analyze(query, content)
+        if deep:
+            # No early stop: a deep run wants every relevant source it can find
+            scheduler = ScrapeScheduler(fetch_fn=fetch_fn, analyze_fn=analyze_fn,
+                                        max_pages=max_pages, min_relevant=float("inf"))
+        else:
+            scheduler = ScrapeScheduler(fetch_fn=fetch_fn, analyze_fn=analyze_fn)
+        scraped_contents, analyzed_contents = scheduler.run(unique_urls)
         
         # Step 6: Synthesize report
         logger.info("Step 6: Synthesizing research report")
@@ -142,21 +224,86 @@ class WebResearchAgent:
             "urls_found": len(unique_urls),
             "urls_scraped": len(scraped_contents),
             "urls_analyzed": len(analyzed_contents),
-            "report": report
+            "report": report,
+            "structured_output_metrics": STRUCTURED_OUTPUT_METRICS.snapshot(),
+            "llm_dispatch_metrics": get_dispatcher().snapshot()
         }
         
-        logger.info(f"Research completed in {execution_time:.2f} seconds")
+        logger.info("Research completed in %.2f seconds", execution_time)
+        logger.info("Structured output metrics: %s", result['structured_output_metrics'])
+        logger.info("LLM dispatch metrics: %s", result['llm_dispatch_metrics'])
         return result
 
 
+def submit_research(queue: Any, queries: List[str], deep: bool = False,
+                    timeout: float = SUBMIT_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    Queue research jobs for workers and wait for all of them.
+    
+    Args:
+        queue: Work queue served by one or more `main.py --worker` processes
+        queries: Research queries
+        deep: Run each as a deep research job
+        timeout: Seconds to wait for the whole batch; jobs still running then are reported as errors
+        
+    Returns:
+        One research result per query, in order; failed jobs carry an "error" key
+    """
+    task_ids = [queue.submit("research", {"query": query, "deep": deep}, PRIORITY_RESEARCH) for query in queries]
+    logger.info("Submitted %s research jobs", len(task_ids))
+    
+    deadline = time.time() + timeout
+    results = []
+    for query, task_id in zip(queries, task_ids):
+        try:
+            results.append(queue.wait(task_id, timeout=max(0.0, deadline - time.time())))
+        except (TaskFailedError, TimeoutError) as e:
+            logger.error("Research job for %r failed: %s", query, e)
+            results.append({"query": query, "error": str(e)})
+    return results
+
+
 def main():
     """Main entry point with command-line interface."""
     parser = argparse.ArgumentParser(description="Web Research Agent")
     parser.add_argument("query", nargs="?", help="Research query")
     parser.add_argument("--interactive", "-i", action="store_true", help="Run in interactive mode")
+    parser.add_argument("--offline", action="store_true", help="Answer from the local corpus of previously scraped pages")
+    parser.add_argument("--deep", action="store_true",
+                        help=f"Scrape up to {DEEP_MAX_PAGES_TO_SCRAPE} pages without stopping early; large source sets are synthesized map-reduce style")
+    parser.add_argument("--record", action="store_true", help="Write every page fetch to the WARC archive")
+    parser.add_argument("--replay", action="store_true", help="Serve page fetches from the WARC archive (no network)")
+    parser.add_argument("--worker", action="store_true", help="Serve research, fetch and analyze tasks from the broker")
+    parser.add_argument("--submit", action="store_true", help="Queue the query for workers instead of running it here")
+    parser.add_argument("--batch", metavar="FILE", help="Queue every query in FILE (one per line) for workers")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Work queue URL for --worker/--submit (default: {BROKER_URL})")
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS, help="Tasks a worker runs at once")
     args = parser.parse_args()
     
-    agent = WebResearchAgent()
+    setup_logging()
+    
+    if args.submit or args.batch:
+        if args.batch:
+            with open(args.batch, encoding="utf-8") as f:
+                queries = [line.strip() for line in f if line.strip()]
+        elif args.query:
+            queries = [args.query]
+        else:
+            parser.error("--submit needs a query")
+        
+        for result in submit_research(open_work_queue(args.broker), queries, deep=args.deep):
+            if "report" in result and "report_path" in result["report"]:
+                print(f"{result['query']}: report saved to {result['report']['report_path']} on {result['worker']}")
+            else:
+                print(f"{result['query']}: error generating report. Check worker logs for details.")
+        return
+    
+    if args.worker:
+        agent = WebResearchAgent(offline=args.offline, broker_url=args.broker, record=args.record, replay=args.replay)
+        Worker(agent, agent.queue, threads=args.threads).run()
+        return
+    
+    agent = WebResearchAgent(offline=args.offline, record=args.record, replay=args.replay)
     
     if args.interactive:
         print("=== Web Research Agent ===")
@@ -171,7 +318,7 @@ def main():
                 continue
                 
             print(f"Researching: {query}")
-            result = agent.run_research(query)
+            result = agent.run_research(query, deep=args.deep)
             
             if "report" in result and "report_path" in result["report"]:
                 print(f"\nResearch complete! Report saved to: {result['report']['report_path']}")
@@ -189,7 +336,7 @@ def main():
                 print("Error generating report. Check logs for details.")
     
     elif args.query:
-        result = agent.run_research(args.query)
+        result = agent.run_research(args.query, deep=args.deep)
         if "report" in result and "report_path" in result["report"]:
             print(f"Research complete! Report saved to: {result['report']['report_path']}")
         else:
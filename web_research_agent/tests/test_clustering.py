@@ -0,0 +1,69 @@
+# tests/test_clustering.py
+import re
+
+import pytest
+
+from agent.clustering import cluster_sources
+from agent.report_prompts import build_group_prompt, build_hierarchical_prompt, fallback_group_summary
+
+TOPICS = [
+    ["qubit", "superconducting", "coherence", "transmon"],
+    ["error", "correction", "surface", "code"],
+    ["photonic", "laser", "interferometer", "boson"],
+    ["cryptography", "shor", "rsa", "post-quantum"],
+]
+
+
+def make_sources(n):
+    return [
+        {
+            "url": f"https://site{i}.example/page",
+            "title": f"{TOPICS[i % len(TOPICS)][0]} study {i}",
+            "key_insights": [" ".join(TOPICS[i % len(TOPICS)]), f"finding number {i}"],
+            "summary": f"summary {i}",
+            "relevance_score": 0.9 - i / 1000,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("n, group_size", [(1, 8), (8, 8), (9, 8), (25, 8), (40, 8), (33, 5), (17, 3)])
+def test_groups_are_bounded_and_cover_every_source_once(n, group_size):
+    groups = cluster_sources(make_sources(n), group_size)
+
+    assert all(0 < len(group) <= group_size for group in groups)
+    indices = sorted(i for group in groups for i in group)
+    assert indices == list(range(n))
+
+
+def test_similar_sources_share_a_group():
+    sources = make_sources(32)
+    groups = cluster_sources(sources, 8)
+
+    # Four topics of eight sources each: every group should be a single topic
+    for group in groups:
+        assert len({i % len(TOPICS) for i in group}) == 1
+
+
+def echo_summary(prompt):
+    """Map step stand-in that cites every source number it was given."""
+    return "Summary " + " ".join(sorted(set(re.findall(r'"citation": "(\[\d+\])"', prompt))))
+
+
+@pytest.mark.parametrize("summarize", [
+    lambda sources, group: echo_summary(build_group_prompt("quantum computing", sources, group)),
+    fallback_group_summary,
+], ids=["map call", "fallback"])
+def test_hierarchical_prompt_preserves_citations(summarize):
+    sources = make_sources(25)
+    groups = cluster_sources(sources, 8)
+    summaries = [summarize(sources, group) for group in groups]
+    prompt = build_hierarchical_prompt("quantum computing", sources, groups, summaries)
+
+    headers = re.findall(r"### Topic group \d+ \(sources ([^)]*)\)", prompt)
+    assert len(headers) == len(groups)
+    for n, source in enumerate(sources, 1):
+        # Fixed number in the reference list, cited in exactly one group header and its summary
+        assert f"[{n}] {source['title']} - {source['url']}" in prompt
+        assert sum(f"[{n}]" in header.split(", ") for header in headers) == 1
+        assert prompt.count(f"[{n}]") >= 3
@@ -0,0 +1,102 @@
+# tests/test_date_extractor.py
+import os
+from datetime import datetime
+
+import pytest
+from bs4 import BeautifulSoup
+
+from agent.date_extractor import extract_publication_date, parse_date
+
+DEBUG_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "debug_output")
+
+
+def soup(html):
+    return BeautifulSoup(html, "html.parser")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-03-05", datetime(2024, 3, 5)),
+    ("2024-03-05T10:30:00Z", datetime(2024, 3, 5, 10, 30)),
+    ("2024-03-05T10:30:00+02:00", datetime(2024, 3, 5, 8, 30)),
+    ("2024/03/05", datetime(2024, 3, 5)),
+    ("03/25/2024", datetime(2024, 3, 25)),
+    ("March 5, 2024", datetime(2024, 3, 5)),
+    ("Sept. 5, 2024", datetime(2024, 9, 5)),
+    ("5 Mar 2024", datetime(2024, 3, 5)),
+    ("2021 Jul", datetime(2021, 7, 1)),
+    ("2021 July", datetime(2021, 7, 1)),
+    ("2021 Jul 15", datetime(2021, 7, 15)),
+    ("2021-07", datetime(2021, 7, 1)),
+    ("2021", datetime(2021, 1, 1)),
+])
+def test_parse_date_formats(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "not a date", "1850-01-01", "3000-01-01", "13/45/2024"])
+def test_parse_date_rejects(value):
+    assert parse_date(value) is None
+
+
+def test_meta_tags_in_priority_order():
+    html = """<head>
+        <meta name="date" content="2020-01-01">
+        <meta property="article:published_time" content="2023-06-01T12:00:00Z">
+    </head>"""
+    assert extract_publication_date(soup(html)) == datetime(2023, 6, 1, 12, 0)
+
+
+def test_citation_publication_date_meta():
+    html = '<meta name="citation_publication_date" content="2021 Jul">'
+    assert extract_publication_date(soup(html)) == datetime(2021, 7, 1)
+
+
+def test_json_ld_nested_date_published():
+    html = """<script type="application/ld+json">
+        {"@graph": [{"@type": "WebPage"}, {"@type": "Article", "datePublished": "2022-11-08"}]}
+    </script>"""
+    assert extract_publication_date(soup(html)) == datetime(2022, 11, 8)
+
+
+def test_json_ld_with_raw_control_characters():
+    html = ('<script type="application/ld+json">'
+            '{"headline": "Line one\nline two\tend", "datePublished": "2023-04-14"}</script>')
+    assert extract_publication_date(soup(html)) == datetime(2023, 4, 14)
+
+
+def test_time_tag():
+    html = '<body><p>Posted <time datetime="2024-02-29T08:00:00Z">yesterday</time></p></body>'
+    assert extract_publication_date(soup(html)) == datetime(2024, 2, 29, 8, 0)
+
+
+def test_structured_date_beats_text():
+    html = '<meta name="pubdate" content="2022-01-02"><body><p>Updated March 5, 2024</p></body>'
+    assert extract_publication_date(soup(html)) == datetime(2022, 1, 2)
+
+
+def test_text_fallback():
+    html = "<body><script>var d = '2019-01-01';</script><p>By A. Writer, March 5, 2024</p></body>"
+    assert extract_publication_date(soup(html)) == datetime(2024, 3, 5)
+
+
+def test_text_fallback_stops_after_scan_limit():
+    html = "<body><p>" + "x" * 500 + "</p><p>March 5, 2024</p></body>"
+    assert extract_publication_date(soup(html), max_scan_chars=100) is None
+    assert extract_publication_date(soup(html), max_scan_chars=1000) == datetime(2024, 3, 5)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("bmcmededuc.biomedcentral.com.html", datetime(2023, 9, 22)),
+    ("onlinedegrees.sandiego.edu.html", None),  # carries no date at all
+    ("pmc.ncbi.nlm.nih.gov.html", datetime(2021, 7, 1)),  # citation_publication_date="2021 Jul"
+    ("www.dartmouth-hitchcock.org.html", datetime(2024, 7, 24, 14, 48, 55)),
+    ("www.forbes.com.html", datetime(2023, 11, 6)),
+    ("www.foreseemed.com.html", datetime(2023, 4, 14)),  # JSON-LD with raw control characters
+    ("www.nature.com.html", datetime(2023, 5, 26)),
+])
+def test_debug_output_pages(name, expected):
+    path = os.path.join(DEBUG_OUTPUT_DIR, name)
+    if not os.path.exists(path):
+        pytest.skip(f"{name} not in debug_output/")
+    with open(path, encoding="utf-8", errors="replace") as f:
+        assert extract_publication_date(soup(f.read())) == expected
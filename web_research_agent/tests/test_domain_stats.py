@@ -0,0 +1,102 @@
+# tests/test_domain_stats.py
+import os
+
+import pytest
+
+from agent.domain_stats import DomainStats
+from config import (
+    DOMAIN_STATS_HALF_LIFE, DOMAIN_SKIP_MIN_ATTEMPTS, SLOW_DOMAIN_LATENCY, THIN_CONTENT_CHARS
+)
+
+URL = "https://news.example/article"
+FULL_PAGE = THIN_CONTENT_CHARS * 10
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def stats(tmp_path, clock):
+    return DomainStats(os.path.join(tmp_path, "domain_stats.db"), clock=clock)
+
+
+def test_unknown_domain_is_neutral(stats):
+    assert stats.score(URL) == 0.0
+    assert not stats.should_skip(URL)
+    assert stats.get(URL)["attempts"] == 0
+
+
+def test_counts_are_per_domain(stats):
+    stats.record_fetch(URL, success=True, latency=0.5, content_length=FULL_PAGE)
+    stats.record_fetch("https://NEWS.example/other", success=False, error="HTTP 500")
+    stats.record_fetch("https://elsewhere.example/", success=False, error="timeout")
+
+    summary = stats.get(URL)
+    assert summary["attempts"] == pytest.approx(2)
+    assert summary["success_rate"] == pytest.approx(2 / 4)
+    assert summary["avg_content_length"] == pytest.approx(FULL_PAGE)
+    assert summary["last_error"] == "HTTP 500"
+
+
+def test_skipped_after_repeated_failures(stats):
+    for _ in range(DOMAIN_SKIP_MIN_ATTEMPTS - 1):
+        stats.record_fetch(URL, success=False, error="HTTP 403")
+    assert not stats.should_skip(URL)  # too few attempts to judge
+
+    stats.record_fetch(URL, success=False, error="HTTP 403")
+    assert stats.should_skip(URL)
+    assert stats.score(URL) < 0
+
+
+def test_failures_decay_and_domain_recovers(stats, clock):
+    for _ in range(DOMAIN_SKIP_MIN_ATTEMPTS):
+        stats.record_fetch(URL, success=False, error="HTTP 403")
+    assert stats.should_skip(URL)
+
+    clock.now += DOMAIN_STATS_HALF_LIFE
+    assert stats.get(URL)["attempts"] == pytest.approx(DOMAIN_SKIP_MIN_ATTEMPTS / 2)
+    assert not stats.should_skip(URL)
+
+    # A success after recovery pulls the domain back up
+    stats.record_fetch(URL, success=True, content_length=FULL_PAGE)
+    assert stats.get(URL)["success_rate"] > 0.25
+
+
+def test_thin_content_counts_as_failure(stats):
+    # Paywalls and consent walls answer 200 with almost no text
+    for _ in range(DOMAIN_SKIP_MIN_ATTEMPTS):
+        stats.record_fetch(URL, success=True, latency=0.3, content_length=THIN_CONTENT_CHARS - 1)
+
+    summary = stats.get(URL)
+    assert summary["success_rate"] == pytest.approx(1 / (DOMAIN_SKIP_MIN_ATTEMPTS + 2))
+    assert summary["last_error"].startswith("thin content")
+    assert stats.should_skip(URL)
+
+
+def test_reliable_fast_domain_outranks_slow_unreliable_one(stats):
+    good, bad = "https://good.example/a", "https://bad.example/a"
+    for _ in range(5):
+        stats.record_fetch(good, success=True, latency=0.5, content_length=FULL_PAGE)
+        stats.record_fetch(bad, success=True, latency=SLOW_DOMAIN_LATENCY + 1, content_length=FULL_PAGE)
+    stats.record_reliability(good, 0.9)
+    stats.record_reliability(bad, 0.1)
+
+    assert stats.score(good) > 0 > stats.score(bad)
+    assert stats.score(good) - stats.score(bad) == pytest.approx(0.25 + 0.5 * 0.8)
+
+
+def test_read_errors_fall_back_to_no_history(stats):
+    stats.record_fetch(URL, success=False, error="HTTP 500")
+    stats.conn.close()
+    assert stats.get(URL)["attempts"] == 0
+    assert stats.score(URL) == 0.0
@@ -0,0 +1,153 @@
+# tests/test_llm.py
+import threading
+import time
+from enum import Enum
+
+import pytest
+
+from agent import llm
+from agent.llm import (
+    LLMDispatcher, PRIORITY_ANALYSIS, PRIORITY_SYNTHESIS, estimate_tokens, is_quota_error
+)
+
+
+class StatusCode(Enum):
+    RESOURCE_EXHAUSTED = 8
+    PERMISSION_DENIED = 7
+
+
+class APIError(Exception):
+    """Shaped like google.api_core's GoogleAPICallError."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.grpc_status_code = status
+
+
+QUOTA_ERROR = APIError("429 Resource has been exhausted (e.g. check quota).", StatusCode.RESOURCE_EXHAUSTED)
+
+
+class FakeModel:
+    """Raises each queued error in turn, then answers every prompt."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"reply to {prompt}"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm.random, "uniform", lambda a, b: 0.0)
+
+
+def test_quota_errors_are_recognized_by_status_only():
+    assert is_quota_error(QUOTA_ERROR)
+    assert is_quota_error(APIError("exhausted", "RESOURCE_EXHAUSTED"))
+    assert not is_quota_error(APIError("API key not valid for quota project", StatusCode.PERMISSION_DENIED))
+    assert not is_quota_error(ValueError("429 quota RESOURCE_EXHAUSTED"))
+
+
+def test_quota_error_halves_limit_then_recovers():
+    dispatcher = LLMDispatcher(initial_concurrency=4, max_concurrency=4)
+    model = FakeModel([QUOTA_ERROR])
+
+    assert dispatcher.generate(model, "p") == "reply to p"
+    assert dispatcher.snapshot() == {"calls": 2, "quota_errors": 1, "retries": 1, "failures": 0,
+                                     "concurrency_limit": 2.5}  # halved to 2, then +1/2
+
+    for _ in range(10):
+        dispatcher.generate(model, "p")
+    assert dispatcher.limit == 4.0
+
+
+def test_limit_never_drops_below_one():
+    dispatcher = LLMDispatcher(initial_concurrency=1, max_concurrency=4, max_retries=3)
+    dispatcher.generate(FakeModel([QUOTA_ERROR] * 3), "p")
+    assert dispatcher.snapshot()["quota_errors"] == 3
+    assert dispatcher.limit >= 1.0
+
+
+def test_gives_up_after_max_retries():
+    dispatcher = LLMDispatcher(max_retries=2)
+    model = FakeModel([QUOTA_ERROR] * 3)
+    with pytest.raises(APIError):
+        dispatcher.generate(model, "p")
+    assert len(model.prompts) == 3
+    assert dispatcher.snapshot()["failures"] == 1
+
+
+def test_other_errors_are_not_retried():
+    dispatcher = LLMDispatcher(initial_concurrency=2)
+    model = FakeModel([APIError("API key not valid for quota project", StatusCode.PERMISSION_DENIED)])
+    with pytest.raises(APIError):
+        dispatcher.generate(model, "p")
+    assert len(model.prompts) == 1
+    assert dispatcher.snapshot()["retries"] == 0
+    assert dispatcher.limit == 2.0
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_waiting_callers_are_served_by_priority():
+    dispatcher = LLMDispatcher(initial_concurrency=1, max_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    class BlockingModel:
+        def generate_content(self, prompt, **kwargs):
+            if prompt == "first":
+                release.wait(5)
+            order.append(prompt)
+            return prompt
+
+    model = BlockingModel()
+    threads = [threading.Thread(target=dispatcher.generate, args=(model, "first"))]
+    threads[0].start()
+    wait_until(lambda: dispatcher.in_flight == 1)
+
+    # Analyses queue up first; the synthesis call arriving last still goes next
+    for n, priority in enumerate([PRIORITY_ANALYSIS] * 3 + [PRIORITY_SYNTHESIS]):
+        name = "synthesis" if priority == PRIORITY_SYNTHESIS else f"analysis {n}"
+        thread = threading.Thread(target=dispatcher.generate, args=(model, name), kwargs={"priority": priority})
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: len(dispatcher.waiting) == n + 1)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["first", "synthesis", "analysis 0", "analysis 1", "analysis 2"]
+
+
+def test_window_budget():
+    dispatcher = LLMDispatcher(requests_per_minute=2, tokens_per_minute=10 ** 9)
+    model = FakeModel()
+    dispatcher.generate(model, "a")
+    dispatcher.generate(model, "b")
+
+    now = time.time()
+    assert dispatcher._budget_wait(now, estimate_tokens("c")) == pytest.approx(llm.QUOTA_WINDOW, abs=1.0)
+
+    dispatcher._expire_window(now + llm.QUOTA_WINDOW + 1)
+    assert dispatcher._budget_wait(now + llm.QUOTA_WINDOW + 1, estimate_tokens("c")) == 0
+
+
+def test_token_budget():
+    tokens = estimate_tokens("x" * 400)
+    dispatcher = LLMDispatcher(requests_per_minute=100, tokens_per_minute=tokens * 2)
+    model = FakeModel()
+    dispatcher.generate(model, "x" * 400)
+    assert dispatcher._budget_wait(time.time(), tokens) == 0
+    dispatcher.generate(model, "x" * 400)
+    assert dispatcher._budget_wait(time.time(), tokens) > 0
@@ -0,0 +1,24 @@
+# tests/test_logging_setup.py
+import logging
+
+import pytest
+
+from agent.logging_setup import SamplingFilter
+
+
+def passed(sampling_filter, name, level, count=20):
+    return sum(sampling_filter.filter(logging.LogRecord(name, level, __file__, 0, "msg", None, None))
+               for _ in range(count))
+
+
+def test_info_is_sampled():
+    assert passed(SamplingFilter({"agent.scraper": 5}), "agent.scraper", logging.INFO) == 4
+
+
+@pytest.mark.parametrize("level", [logging.DEBUG, logging.WARNING, logging.ERROR])
+def test_other_levels_always_pass(level):
+    assert passed(SamplingFilter({"agent.scraper": 5}), "agent.scraper", level) == 20
+
+
+def test_loggers_without_a_rate_pass():
+    assert passed(SamplingFilter({"agent.scraper": 5}), "agent.analyzer", logging.INFO) == 20
@@ -0,0 +1,147 @@
+# tests/test_scheduler.py
+import threading
+import time
+
+import pytest
+
+from agent.scheduler import ScrapeScheduler
+
+
+def candidates(n, domains=None, relevance=None):
+    return [
+        {
+            "url": f"https://{domains[i] if domains else f'site{i}.example'}/page{i}",
+            "initial_relevance": relevance[i] if relevance else 1.0 - i / 100
+        }
+        for i in range(n)
+    ]
+
+
+class Pipeline:
+    """Stub fetch/analyze pair that records call order and concurrency."""
+
+    def __init__(self, scores=None, default_score=0.9, delay=0.0):
+        self.scores = scores or {}
+        self.default_score = default_score
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.fetched = []
+        self.active = {}
+        self.max_active = 0
+        self.max_active_per_domain = 0
+
+    def fetch(self, url_data):
+        domain = url_data["url"].split("/")[2]
+        with self.lock:
+            self.fetched.append(url_data["url"])
+            self.active[domain] = self.active.get(domain, 0) + 1
+            self.max_active = max(self.max_active, sum(self.active.values()))
+            self.max_active_per_domain = max(self.max_active_per_domain, self.active[domain])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[domain] -= 1
+        return {"url": url_data["url"], "success": True, "content": "text"}
+
+    def analyze(self, content):
+        return {"url": content["url"], "relevance_score": self.scores.get(content["url"], self.default_score)}
+
+
+def test_stops_once_enough_sources_are_relevant():
+    pipeline = Pipeline(default_score=0.9)
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=20, max_in_flight=1, min_relevant=3)
+    scraped, analyzed = scheduler.run(candidates(20))
+
+    assert len(pipeline.fetched) == 3
+    assert len(scraped) == len(analyzed) == 3
+
+
+def test_in_flight_fetches_finish_after_early_stop():
+    pipeline = Pipeline(default_score=0.9, delay=0.02)
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=20, max_in_flight=4, min_relevant=3)
+    scraped, analyzed = scheduler.run(candidates(20))
+
+    # Fetches already running when the third relevant source arrives are finished
+    # and kept, but no new ones start: at most max_in_flight - 1 beyond the third
+    assert 3 <= len(pipeline.fetched) <= 3 + 4 - 1
+    assert len(analyzed) == len(pipeline.fetched)
+
+
+def test_irrelevant_sources_do_not_count():
+    pipeline = Pipeline(default_score=0.4)  # the threshold itself is not enough
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=8, max_in_flight=2,
+                                min_relevant=3, relevance_threshold=0.4)
+    scheduler.run(candidates(20))
+    assert len(pipeline.fetched) == 8
+
+
+def test_page_cap_without_early_stop():
+    pipeline = Pipeline(default_score=0.9)
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=12, max_in_flight=3,
+                                min_relevant=float("inf"))
+    scheduler.run(candidates(20))
+    assert len(pipeline.fetched) == 12
+
+
+def test_runs_out_of_candidates():
+    pipeline = Pipeline(default_score=0.0)
+    scraped, analyzed = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=10).run(candidates(4))
+    assert len(pipeline.fetched) == len(analyzed) == 4
+
+
+def test_in_flight_cap():
+    pipeline = Pipeline(default_score=0.0, delay=0.02)
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=12, max_in_flight=3)
+    scheduler.run(candidates(12))
+    assert pipeline.max_active == 3
+
+
+def test_one_fetch_per_domain_at_a_time():
+    domains = ["a.example", "b.example"] * 6
+    pipeline = Pipeline(default_score=0.0, delay=0.02)
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=12, max_in_flight=4)
+    scheduler.run(candidates(12, domains=domains))
+
+    assert len(pipeline.fetched) == 12
+    assert pipeline.max_active_per_domain == 1
+    assert pipeline.max_active == 2
+
+
+def test_domain_results_reprioritize_queue():
+    # a.example's first page scores 0, so its second page drops below b.example's
+    domains = ["a.example", "a.example", "b.example"]
+    url_a1, url_a2, url_b = [c["url"] for c in candidates(3, domains=domains)]
+    pipeline = Pipeline(scores={url_a1: 0.0})
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=3, max_in_flight=1,
+                                min_relevant=10, relevance_threshold=0.4)
+    scheduler.run(candidates(3, domains=domains, relevance=[0.9, 0.8, 0.7]))
+
+    assert pipeline.fetched == [url_a1, url_b, url_a2]
+
+
+def test_relevant_domain_is_boosted():
+    domains = ["a.example", "b.example", "a.example"]
+    url_a1, url_b, url_a2 = [c["url"] for c in candidates(3, domains=domains)]
+    pipeline = Pipeline(scores={url_a1: 1.0})
+    scheduler = ScrapeScheduler(pipeline.fetch, pipeline.analyze, max_pages=3, max_in_flight=1,
+                                min_relevant=10, relevance_threshold=0.4)
+    scheduler.run(candidates(3, domains=domains, relevance=[0.9, 0.7, 0.5]))
+
+    assert pipeline.fetched == [url_a1, url_a2, url_b]
+
+
+def test_fetch_and_analysis_errors_are_contained():
+    def fetch(url_data):
+        if url_data["url"].endswith("page0"):
+            raise ConnectionError("refused")
+        if url_data["url"].endswith("page1"):
+            return {"url": url_data["url"], "success": False, "content": "", "error": "HTTP 404"}
+        return {"url": url_data["url"], "success": True, "content": "text"}
+
+    def analyze(content):
+        if content["url"].endswith("page2"):
+            raise ValueError("bad reply")
+        return {"url": content["url"], "relevance_score": 0.9}
+
+    scraped, analyzed = ScrapeScheduler(fetch, analyze, max_pages=10, min_relevant=10).run(candidates(4))
+    assert sorted(page["url"][-5:] for page in scraped) == ["page1", "page2", "page3"]
+    assert [analysis["url"][-5:] for analysis in analyzed] == ["page3"]
@@ -0,0 +1,134 @@
+# tests/test_search_tool.py
+import os
+
+import pytest
+import requests
+
+from agent.cache import TTLCache
+from agent.search_tool import SearchTool
+
+
+class FakeSerper:
+    """Stands in for SearchTool._post; answers per query, or with a canned batch response."""
+
+    def __init__(self, batch_response=None, failing_queries=(), error_queries=()):
+        self.batch_response = batch_response
+        self.failing_queries = set(failing_queries)
+        self.error_queries = set(error_queries)
+        self.requests = []
+
+    def answer(self, payload):
+        if payload["q"] in self.error_queries:
+            return {"message": "Query not allowed", "statusCode": 400}
+        key = "news" if payload.get("type") == "news" else "organic"
+        return {key: [{"link": f"https://{payload['q'].replace(' ', '-')}.example/{key}", "title": payload["q"]}]}
+
+    def __call__(self, body):
+        self.requests.append(body)
+        if isinstance(body, list):
+            if self.batch_response is not None:
+                return self.batch_response(body)
+            return [self.answer(payload) for payload in body]
+        if body["q"] in self.failing_queries:
+            raise requests.exceptions.HTTPError("500 Server Error")
+        return self.answer(body)
+
+
+@pytest.fixture
+def tool(tmp_path):
+    tool = SearchTool(cache=TTLCache(os.path.join(tmp_path, "cache.db")))
+    tool._post = FakeSerper()
+    return tool
+
+
+def links(results):
+    return [result.get("organic", result.get("news"))[0]["link"] if "error" not in result else "error"
+            for result in results]
+
+
+def test_one_batch_request_for_all_searches(tool):
+    results = tool.search_batch(["quantum", "qubits"], include_news=True)
+
+    assert len(tool._post.requests) == 1
+    assert [payload.get("type", "search") for payload in tool._post.requests[0]] == ["search", "news"] * 2
+    assert links(results) == ["https://quantum.example/organic", "https://quantum.example/news",
+                              "https://qubits.example/organic", "https://qubits.example/news"]
+
+
+def test_single_search_is_not_batched(tool):
+    tool.search("quantum")
+    assert isinstance(tool._post.requests[0], dict)
+
+
+def test_duplicate_queries_are_sent_once(tool):
+    results = tool.search_batch(["Quantum  Computing", "quantum computing", "qubits"])
+    assert [payload["q"] for payload in tool._post.requests[0]] == ["Quantum  Computing", "qubits"]
+    assert len(results) == 2
+
+
+def test_repeated_searches_are_served_from_cache(tool):
+    tool.search_batch(["quantum", "qubits"])
+    results = tool.search_batch(["QUANTUM", "qubits", "photonics"])
+
+    # Only the new query goes out, on its own
+    assert tool._post.requests[1] == tool._build_payload("photonics", "search", 5)
+    assert len(tool._post.requests) == 2
+    assert links(results) == ["https://quantum.example/organic", "https://qubits.example/organic",
+                              "https://photonics.example/organic"]
+
+
+def test_result_count_is_part_of_the_cache_key(tool):
+    tool.search("quantum", num_results=5)
+    tool.search("quantum", num_results=10)
+    assert len(tool._post.requests) == 2
+    assert tool._post.requests[1]["num"] == 10
+
+
+def connection_reset(body):
+    raise requests.exceptions.ConnectionError("reset")
+
+
+@pytest.mark.parametrize("batch_response", [
+    lambda body: {"message": "Batch requests not supported"},
+    lambda body: [],
+    connection_reset,
+], ids=["error object", "wrong length", "request error"])
+def test_failed_batch_falls_back_to_single_requests(tool, batch_response):
+    tool._post.batch_response = batch_response
+    results = tool.search_batch(["quantum", "qubits"])
+
+    assert [request["q"] for request in tool._post.requests[1:]] == ["quantum", "qubits"]
+    assert links(results) == ["https://quantum.example/organic", "https://qubits.example/organic"]
+
+
+def test_error_slot_in_batch_is_retried_and_not_cached(tool):
+    tool._post.batch_response = lambda body: [tool._post.answer(body[0]), {"message": "Rate limited"}]
+    tool._post.error_queries = {"qubits"}
+    results = tool.search_batch(["quantum", "qubits"])
+
+    assert tool._post.requests[1:] == [tool._build_payload("qubits", "search", 5)]
+    assert links(results) == ["https://quantum.example/organic", "error"]
+
+    tool._post.error_queries = set()
+    assert links(tool.search_batch(["quantum", "qubits"])) == ["https://quantum.example/organic",
+                                                              "https://qubits.example/organic"]
+    assert tool._post.requests[2:] == [tool._build_payload("qubits", "search", 5)]
+
+
+def test_only_failing_searches_return_errors(tool):
+    tool._post.batch_response = lambda body: {"message": "Batch requests not supported"}
+    tool._post.failing_queries = {"qubits"}
+    tool._post.error_queries = {"photonics"}
+    results = tool.search_batch(["quantum", "qubits", "photonics"])
+
+    assert links(results) == ["https://quantum.example/organic", "error", "error"]
+    assert results[1] == {"error": "500 Server Error", "organic": []}
+    assert results[2]["organic"] == [] and "Query not allowed" in results[2]["error"]
+
+    # Errors are not cached: the next run asks Serper again
+    tool._post.failing_queries = set()
+    tool._post.error_queries = set()
+    sent = len(tool._post.requests)
+    assert links(tool.search_batch(["quantum", "qubits", "photonics"]))[1:] == [
+        "https://qubits.example/organic", "https://photonics.example/organic"]
+    assert [payload["q"] for payload in tool._post.requests[sent]] == ["qubits", "photonics"]
@@ -0,0 +1,46 @@
+# tests/test_structured_output.py
+import pytest
+
+from agent.structured_output import (
+    CONTENT_ANALYSIS_SCHEMA, ContentAnalysisResult, StructuredOutput, StructuredOutputMetrics,
+    build_result, coerce, parse_json_response
+)
+
+
+def analysis(**scores):
+    data = {"relevance_score": 0.5, "reliability_score": 0.5, "key_insights": ["a"], "summary": "s"}
+    data.update(scores)
+    return data
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), "-inf", "NaN"])
+def test_non_finite_numbers_are_rejected(value):
+    with pytest.raises(ValueError):
+        coerce(value, {"type": "NUMBER"})
+    assert build_result(ContentAnalysisResult, analysis(relevance_score=value), CONTENT_ANALYSIS_SCHEMA) is None
+
+
+def test_nan_literal_in_reply_is_rejected():
+    data, _ = parse_json_response('{"relevance_score": NaN, "reliability_score": 0.4, "key_insights": [], "summary": "s"}')
+    assert build_result(ContentAnalysisResult, data, CONTENT_ANALYSIS_SCHEMA) is None
+
+
+def test_scores_are_clamped_to_unit_range():
+    result = build_result(ContentAnalysisResult, analysis(relevance_score=7.0, reliability_score=-2, freshness_score="1.5"),
+                          dict(CONTENT_ANALYSIS_SCHEMA, properties=dict(CONTENT_ANALYSIS_SCHEMA["properties"],
+                                                                        freshness_score={"type": "NUMBER"})))
+    assert (result.relevance_score, result.reliability_score, result.freshness_score) == (1.0, 0.0, 1.0)
+
+
+def test_failed_first_call_is_counted():
+    class FailingLLM:
+        def generate(self, *args, **kwargs):
+            raise RuntimeError("quota exhausted")
+
+    structured = StructuredOutput.__new__(StructuredOutput)
+    structured.llm = FailingLLM()
+    structured.metrics = StructuredOutputMetrics()
+
+    with pytest.raises(RuntimeError):
+        structured.generate(None, "prompt", ContentAnalysisResult, CONTENT_ANALYSIS_SCHEMA, priority=0)
+    assert (structured.metrics.calls, structured.metrics.failed) == (1, 1)
@@ -0,0 +1,75 @@
+# tests/test_text.py
+"""agent.text must produce byte-identical output to the regex implementations it replaced."""
+import os
+import re
+import unicodedata
+
+import pytest
+
+from agent.text import clean_text, extract_main_content, iter_clean_text
+
+DEBUG_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "debug_output")
+
+
+def legacy_clean_text(text: str) -> str:
+    """clean_text as it was in agent/utils.py before agent.text existed."""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'[^\w\s.,;:?!\'\"()-]', ' ', text)
+    return text
+
+
+def legacy_extract_main_content(html_content: str) -> str:
+    """extract_main_content as it was in agent/utils.py before agent.text existed."""
+    html_content = re.sub(r'<script[^>]*>.*?</script>', ' ', html_content, flags=re.DOTALL)
+    html_content = re.sub(r'<style[^>]*>.*?</style>', ' ', html_content, flags=re.DOTALL)
+    text = re.sub(r'<[^>]*>', ' ', html_content)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def debug_pages():
+    if not os.path.isdir(DEBUG_OUTPUT_DIR):
+        return []
+    return sorted(name for name in os.listdir(DEBUG_OUTPUT_DIR) if name.endswith(".html"))
+
+
+def read_page(name: str) -> str:
+    with open(os.path.join(DEBUG_OUTPUT_DIR, name), encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+SYNTHETIC_PAGES = {
+    "empty": "",
+    "unclosed script": "<script>var a = 1;" * 5000,
+    "unclosed script after content": "<p>Intro</p><script type='text/javascript'>var a = 1;",
+    "unclosed style": "<p>Intro</p><style>p { color: red }",
+    "script and style": "<style>b{}</style><p>One</p><script src='x.js'></script><p>Two</p><script>x</script>",
+    "uppercase and attributes": "<SCRIPT>kept</SCRIPT><scripts>text</scripts><script\n defer>gone</script>",
+    "unclosed tag": "<p>Text <a href='x'",
+    "unicode": "<p>café — ＡＢ   naïve\tso’s \U0001f600</p>",
+}
+
+
+def assert_identical(html: str, chunk_sizes):
+    extracted = extract_main_content(html)
+    assert extracted == legacy_extract_main_content(html)
+    assert clean_text(extracted) == legacy_clean_text(extracted)
+    assert clean_text(html) == legacy_clean_text(html)
+
+    expected = legacy_clean_text(html)
+    for chunk_size in chunk_sizes:
+        chunks = (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
+        assert ''.join(iter_clean_text(chunks)) == expected, f"iter_clean_text differs at chunk size {chunk_size}"
+
+
+@pytest.mark.parametrize("name", debug_pages())
+def test_debug_output_pages(name):
+    assert_identical(read_page(name), chunk_sizes=(7, 4096, 65536))
+
+
+@pytest.mark.parametrize("name", SYNTHETIC_PAGES)
+def test_synthetic_pages(name):
+    assert_identical(SYNTHETIC_PAGES[name], chunk_sizes=(1, 2, 7, 4096, 65536))
@@ -0,0 +1,192 @@
+# tests/test_work_queue.py
+import os
+import threading
+import time
+
+import pytest
+
+from agent import work_queue
+from agent.work_queue import (
+    SQLiteWorkQueue, TaskFailedError, PRIORITY_ANALYZE, PRIORITY_FETCH, PRIORITY_RESEARCH
+)
+from agent.worker import Worker
+
+KINDS = ["analyze", "fetch", "research"]
+
+
+class FakeClock:
+    """Stands in for the time module inside agent.work_queue."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteWorkQueue(os.path.join(tmp_path, "queue.db"), max_attempts=2, result_ttl=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(work_queue, "time", fake)
+    return fake
+
+
+def test_lease_order_and_complete(queue):
+    research = queue.submit("research", {"query": "q"}, PRIORITY_RESEARCH)
+    fetch = queue.submit("fetch", {"url": "u"}, PRIORITY_FETCH)
+    analyze = queue.submit("analyze", {"url": "u"}, PRIORITY_ANALYZE)
+
+    leased = [queue.lease("w1", KINDS, 30) for _ in range(3)]
+    assert [task["id"] for task in leased] == [analyze, fetch, research]
+    assert leased[1] == {"id": fetch, "kind": "fetch", "payload": {"url": "u"}, "attempts": 1}
+    assert queue.lease("w1", KINDS, 30) is None
+
+    queue.complete(fetch, "w1", {"ok": True})
+    assert queue.status(fetch) == {"status": "done", "result": {"ok": True}, "error": None}
+    assert queue.wait(fetch, timeout=0) == {"ok": True}
+
+
+def test_lease_only_requested_kinds(queue):
+    queue.submit("research", {}, PRIORITY_RESEARCH)
+    assert queue.lease("w1", ["fetch", "analyze"], 30) is None
+    assert queue.lease("w1", ["research"], 30)["kind"] == "research"
+
+
+def test_other_workers_cannot_complete_or_fail(queue):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    queue.lease("w1", KINDS, 30)
+
+    queue.complete(task_id, "w2", "stolen")
+    queue.fail(task_id, "w2", "stolen")
+    assert queue.status(task_id)["status"] == "leased"
+
+
+def test_fail_retries_until_out_of_attempts(queue):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+
+    queue.lease("w1", KINDS, 30)
+    queue.fail(task_id, "w1", "flaky")
+    assert queue.status(task_id)["status"] == "pending"
+
+    assert queue.lease("w2", KINDS, 30)["attempts"] == 2
+    queue.fail(task_id, "w2", "broken")
+    assert queue.status(task_id) == {"status": "failed", "result": None, "error": "broken"}
+    assert queue.lease("w1", KINDS, 30) is None
+    with pytest.raises(TaskFailedError):
+        queue.wait(task_id, timeout=0)
+
+
+def test_expired_lease_is_requeued(queue, clock):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    queue.lease("w1", KINDS, 30)
+
+    clock.now += 31
+    task = queue.lease("w2", KINDS, 30)
+    assert task["id"] == task_id and task["attempts"] == 2
+
+    # The first worker lost its lease, so its late result is dropped
+    queue.complete(task_id, "w1", "late")
+    assert queue.status(task_id)["status"] == "leased"
+    queue.complete(task_id, "w2", "on time")
+    assert queue.wait(task_id, timeout=0) == "on time"
+
+
+def test_renewed_lease_is_kept(queue, clock):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    queue.lease("w1", KINDS, 30)
+
+    clock.now += 20
+    queue.extend_lease([task_id], "w1", 30)
+    clock.now += 20
+    assert queue.lease("w2", KINDS, 30) is None
+
+
+def test_expired_lease_on_last_attempt_fails(queue, clock):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    for _ in range(2):
+        queue.lease("w1", KINDS, 30)
+        clock.now += 31
+    assert queue.lease("w1", KINDS, 30) is None
+    assert queue.status(task_id) == {"status": "failed", "result": None, "error": "lease expired"}
+
+
+def test_finished_tasks_expire(queue, clock):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    queue.lease("w1", KINDS, 30)
+    queue.complete(task_id, "w1", 1)
+
+    clock.now += 61
+    queue.lease("w1", KINDS, 30)
+    assert queue.status(task_id) is None
+
+
+def test_wait_times_out(queue, clock):
+    task_id = queue.submit("fetch", {}, PRIORITY_FETCH)
+    with pytest.raises(TimeoutError):
+        queue.wait(task_id, timeout=5)
+
+
+def test_reserve_host_spaces_requests(queue, clock):
+    assert queue.reserve_host("example.com", 2.0) == 0.0
+    assert queue.reserve_host("example.com", 2.0) == 2.0
+    assert queue.reserve_host("example.com", 2.0) == 4.0
+    assert queue.reserve_host("other.example", 2.0) == 0.0
+
+    clock.now += 10
+    assert queue.reserve_host("example.com", 2.0) == 0.0
+
+
+class FakeAgent:
+    """Research jobs fan out to fetch and analyze sub-tasks, like WebResearchAgent with a broker."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.failures = {}
+
+    def run_research(self, query, deep=False):
+        page = self.queue.wait(self.queue.submit("fetch", {"url": query}, PRIORITY_FETCH), timeout=30)
+        analysis = self.queue.wait(self.queue.submit("analyze", {"query": query, "content": page}, PRIORITY_ANALYZE),
+                                   timeout=30)
+        return {"query": query, "deep": deep, "analysis": analysis}
+
+    def fetch(self, url_data):
+        if url_data["url"] == "broken":
+            raise RuntimeError("fetch failed")
+        return {"url": url_data["url"], "success": True, "content": "text", "published_at": None}
+
+    def analyze(self, query, content):
+        return {"url": content["url"], "relevance_score": 0.9}
+
+
+@pytest.fixture
+def worker(queue):
+    worker = Worker(FakeAgent(queue), queue, threads=2, worker_id="test-worker")
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    yield worker
+    worker.stop()
+    thread.join(timeout=5)
+
+
+def test_worker_runs_research_with_sub_tasks(queue, worker):
+    # Two research jobs on two threads: one thread must stay free for their sub-tasks
+    task_ids = [queue.submit("research", {"query": q, "deep": True}, PRIORITY_RESEARCH) for q in ("a", "b")]
+    results = [queue.wait(task_id, timeout=30) for task_id in task_ids]
+
+    assert [r["query"] for r in results] == ["a", "b"]
+    assert all(r["worker"] == "test-worker" and r["deep"] for r in results)
+    assert results[0]["analysis"] == {"url": "a", "relevance_score": 0.9}
+
+
+def test_worker_reports_failures(queue, worker):
+    task_id = queue.submit("fetch", {"url": "broken"}, PRIORITY_FETCH)
+    with pytest.raises(TaskFailedError, match="fetch failed"):
+        queue.wait(task_id, timeout=30)